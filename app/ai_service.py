@@ -1,45 +1,84 @@
-from openai import OpenAI
-from typing import List, Dict, Any
-from datetime import datetime
+from openai import APIConnectionError, APIStatusError, RateLimitError
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone, date
+import asyncio
 import logging
-import random
+import zlib
+import orjson
 from .config import settings
+from .models_fast import batch_output_row_decoder
+from .openai_client import client as shared_openai_client
+from .response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
-class AIService:
-    #AI Service class for generating personalized recipes using OpenAI GPT.Handles recipe generation, parsing, and fallback mechanisms.
-    
-    def __init__(self):
-        #Initialize the AI service with OpenAI client. Sets up the OpenAI client using API key from settings.
+# JSON Schema enforced server-side via structured outputs, so responses are
+# guaranteed well-formed JSON matching the system prompt's fields
+RECIPE_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recipe_name": {"type": "string"},
+        "ingredients": {"type": "array", "items": {"type": "string"}},
+        "instructions": {"type": "array", "items": {"type": "string"}},
+        "cooking_time": {"type": "string"},
+        "difficulty": {"type": "string"},
+        "servings": {"type": "integer"},
+        "serving_size": {"type": "string"},
+        "dietary_tags": {"type": "array", "items": {"type": "string"}},
+        "nutritional_facts": {
+            "type": "object",
+            "properties": {
+                "calories": {"type": "number"},
+                "protein": {"type": "string"},
+                "carbohydrates": {"type": "string"},
+                "fat": {"type": "string"},
+                "fiber": {"type": "string"},
+                "sugar": {"type": "string"},
+                "sodium": {"type": "string"}
+            },
+            "required": ["calories", "protein", "carbohydrates", "fat", "fiber", "sugar", "sodium"],
+            "additionalProperties": False
+        },
+        "image_prompt": {"type": "string"}
+    },
+    "required": [
+        "recipe_name", "ingredients", "instructions", "cooking_time", "difficulty",
+        "servings", "serving_size", "dietary_tags", "nutritional_facts", "image_prompt"
+    ],
+    "additionalProperties": False
+}
 
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+_RECIPE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "Recipe", "schema": RECIPE_JSON_SCHEMA, "strict": True}
+}
 
-    def generate_recipe(self, user_profile: Dict[str, Any], similar_recipes: List[Dict[str, Any]]) -> Dict[str, Any]:
-        #Generate a personalized recipe using OpenAI GPT based on user preferences and similar recipes.
-        
-        #Args: user_profile (Dict[str, Any]): User's profile containing preferences, dietary restrictions, etc.
-        #similar_recipes (List[Dict[str, Any]]): List of similar recipes for inspiration
-            
-        #Returns: Dict[str, Any]: Generated recipe with all required fields including image_prompt
-            
-        #Raises: Exception: If recipe generation fails, returns fallback recipe
-        
-        try:
-            # Create context from user profile and similar recipes
-            context = self._create_context(user_profile, similar_recipes)
-            
-            # Log the final prompt being sent to OpenAI
-            final_prompt = f"Generate a personalized recipe based on this context: {context}"
-            logger.info(f"Final prompt sent to OpenAI: {final_prompt}")
-            
-            # Generate recipe using OpenAI GPT model
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a professional chef and recipe creator with extensive culinary expertise. Generate personalized recipes based on user preferences and similar recipes.
+# Packed variant: one completion returns recipes for several profiles at once,
+# each tagged with the student_id it belongs to for dispatch
+_PACKED_RECIPE_ITEM = {
+    "type": "object",
+    "properties": {**RECIPE_JSON_SCHEMA["properties"], "student_id": {"type": "string"}},
+    "required": RECIPE_JSON_SCHEMA["required"] + ["student_id"],
+    "additionalProperties": False
+}
+
+_PACKED_RECIPES_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "RecipeList",
+        "schema": {
+            "type": "object",
+            "properties": {"recipes": {"type": "array", "items": _PACKED_RECIPE_ITEM}},
+            "required": ["recipes"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+# Kept byte-identical across calls (never re-formatted) so the OpenAI prompt
+# cache can reuse the prefix: cheaper input tokens and lower time-to-first-byte
+_SYSTEM_PROMPT = """You are a professional chef and recipe creator with extensive culinary expertise. Generate personalized recipes based on user preferences and similar recipes.
 
 IMPORTANT: You must return a valid JSON object with ALL the following fields:
 {
@@ -76,40 +115,331 @@ Guidelines for better recipe creation:
 - Specify clear serving size (e.g., "1 cup", "200g", "1 piece")
 - Ensure nutritional facts are realistic and balanced
 - Consider dietary restrictions when calculating macros"""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Generate a personalized recipe based on this context: {context}"
-                    }
+
+class AIService:
+    #AI Service class for generating personalized recipes using OpenAI GPT.Handles recipe generation, parsing, and fallback mechanisms.
+
+    def __init__(self):
+        #Initialize the AI service with the shared pooled async OpenAI client.
+
+        self.client = shared_openai_client
+        # Bound concurrent OpenAI calls so bulk generation saturates but never exceeds rate limits
+        self._semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+    async def _create_chat_completion(self, **kwargs):
+        #Call the chat completions API with bounded concurrency and retry on 429/5xx errors.
+
+        async with self._semaphore:
+            delay = 1.0
+            for attempt in range(settings.OPENAI_MAX_RETRIES):
+                try:
+                    return await self.client.chat.completions.create(**kwargs)
+                except (RateLimitError, APIConnectionError) as e:
+                    if attempt == settings.OPENAI_MAX_RETRIES - 1:
+                        raise
+                    logger.warning(f"OpenAI call failed (attempt {attempt + 1}): {e}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                except APIStatusError as e:
+                    # Retry server-side errors only; client errors are not transient
+                    if e.status_code < 500 or attempt == settings.OPENAI_MAX_RETRIES - 1:
+                        raise
+                    logger.warning(f"OpenAI server error {e.status_code} (attempt {attempt + 1}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+
+    async def generate_recipes_bulk(self, user_profiles: List[Dict[str, Any]], similar_recipes_by_user: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+        #Generate recipes for multiple users concurrently using asyncio.gather.
+
+        #Args: user_profiles (List[Dict[str, Any]]): User profiles to generate recipes for
+        #similar_recipes_by_user (Optional[Dict[str, List]]): Similar recipes keyed by student_id
+
+        #Returns: List[Dict[str, Any]]: Generated recipes in the same order as user_profiles
+
+        similar_recipes_by_user = similar_recipes_by_user or {}
+        tasks = [
+            self.generate_recipe(profile, similar_recipes_by_user.get(profile.get("student_id"), []))
+            for profile in user_profiles
+        ]
+        return await asyncio.gather(*tasks)
+
+    async def generate_recipes_packed(self, user_profiles: List[Dict[str, Any]], similar_recipes_by_user: Optional[Dict[str, List[Dict[str, Any]]]] = None, pack: int = 4) -> Dict[str, Dict[str, Any]]:
+        #Generate recipes for many users by packing several profiles into each completion.
+        #Amortizes the system prompt across pack tasks and cuts RPM pressure; bulk jobs only,
+        #single interactive requests should keep using generate_recipe.
+
+        #Args: user_profiles (List[Dict[str, Any]]): User profiles to generate recipes for
+        #similar_recipes_by_user (Optional[Dict[str, List]]): Similar recipes keyed by student_id
+        #pack (int): Number of profiles packed into one completion
+
+        #Returns: Dict[str, Dict[str, Any]]: Generated recipes keyed by student_id
+
+        similar_recipes_by_user = similar_recipes_by_user or {}
+        groups = [user_profiles[i:i + pack] for i in range(0, len(user_profiles), pack)]
+
+        # Fan out ceil(N/pack) packed calls concurrently
+        group_results = await asyncio.gather(
+            *[self._generate_packed_group(group, similar_recipes_by_user) for group in groups]
+        )
+
+        recipes_by_user = {}
+        for group_recipes in group_results:
+            recipes_by_user.update(group_recipes)
+
+        # Fall back individually for any user the model skipped
+        for profile in user_profiles:
+            student_id = profile.get("student_id")
+            if student_id not in recipes_by_user:
+                recipes_by_user[student_id] = await self._get_fallback_recipe(profile)
+
+        return recipes_by_user
+
+    async def _generate_packed_group(self, profiles: List[Dict[str, Any]], similar_recipes_by_user: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        #Generate recipes for one packed group of profiles in a single completion.
+
+        try:
+            parts = [f"Generate {len(profiles)} personalized recipes, one per profile below. Tag each recipe with the student_id of its profile."]
+            for i, profile in enumerate(profiles):
+                context = self._create_context(profile, similar_recipes_by_user.get(profile.get("student_id"), []))
+                parts.append(f"Profile {i + 1} (student_id: {profile['student_id']}):\n{context}")
+
+            response = await self._create_chat_completion(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": "\n\n".join(parts)}
                 ],
+                response_format=_PACKED_RECIPES_RESPONSE_FORMAT,
+                prompt_cache_key="recipe_v1",
+                temperature=0.8,
+                max_tokens=1500 * len(profiles)
+            )
+
+            parsed = orjson.loads(response.choices[0].message.content)
+            now = datetime.now(timezone.utc)
+            recipes_by_user = {}
+            for recipe_data in parsed.get("recipes", []):
+                student_id = recipe_data.pop("student_id", "")
+                recipe_data["user_id"] = student_id
+                recipe_data["generated_at"] = now
+                recipe_data["image_url"] = recipe_data.get("image_url", "")
+                recipes_by_user[student_id] = recipe_data
+            return recipes_by_user
+
+        except Exception as e:
+            logger.error(f"Error generating packed recipe group: {e}")
+            return {}
+
+    async def generate_recipe(self, user_profile: Dict[str, Any], similar_recipes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        #Generate a personalized recipe using OpenAI GPT based on user preferences and similar recipes.
+        
+        #Args: user_profile (Dict[str, Any]): User's profile containing preferences, dietary restrictions, etc.
+        #similar_recipes (List[Dict[str, Any]]): List of similar recipes for inspiration
+            
+        #Returns: Dict[str, Any]: Generated recipe with all required fields including image_prompt
+            
+        #Raises: Exception: If recipe generation fails, returns fallback recipe
+
+        image_task = None
+        try:
+            # One timestamp per request; reused by the cache-hit and miss paths
+            now = datetime.now(timezone.utc)
+
+            # Create context from user profile and similar recipes
+            context = self._create_context(user_profile, similar_recipes)
+
+            # Log the final prompt being sent to OpenAI
+            final_prompt = f"Generate a personalized recipe based on this context: {context}"
+            logger.info("Final prompt sent to OpenAI: %s", final_prompt)
+
+            # Check the semantic cache before paying for an OpenAI call.
+            # Namespaced per dietary profile so restricted users never get another profile's recipe.
+            # Exact tier first: identical contexts skip even the embedding call.
+            cache_namespace = ",".join(sorted(user_profile.get('dietary_preferences', []))) or "default"
+            cached_recipe = response_cache.search_exact(context, namespace=cache_namespace)
+            context_embedding: List[float] = []
+            if not cached_recipe:
+                context_embedding = await self._get_context_embedding(context)
+                if context_embedding:
+                    cached_recipe = response_cache.search(context_embedding, namespace=cache_namespace)
+            if cached_recipe:
+                cached_recipe["user_id"] = user_profile["student_id"]
+                cached_recipe["generated_at"] = now
+                return cached_recipe
+
+            # Kick off image generation concurrently with the chat completion when enabled,
+            # seeded from the user's favorites (the recipe name doesn't exist yet).
+            # Total latency becomes max(chat, image) instead of their sum.
+            if settings.GENERATE_IMAGES:
+                seed_prompt = self._build_image_seed_prompt(user_profile)
+                image_task = asyncio.create_task(self._generate_recipe_image(seed_prompt))
+
+            # Generate recipe using OpenAI GPT model
+            response = await self._create_chat_completion(
+                model=settings.OPENAI_MODEL,
+                messages=self._build_messages(context),
+                response_format=_RECIPE_RESPONSE_FORMAT,
+                prompt_cache_key="recipe_v1",  # route repeat calls to the same prompt-cache shard
                 temperature=0.8,  # Slightly higher creativity for better recipe variety
                 max_tokens=1500   # More tokens for detailed recipes and instructions
             )
-            
-            # Parse the response
+
+            # Parse the response (pure-CPU, stays sync); fall back to default recipe on parse failure
             recipe_text = response.choices[0].message.content
-            recipe_data = self._parse_recipe_response(recipe_text)
-            
-            # Generate image URL using the image prompt
-            image_prompt = recipe_data.get("image_prompt", "")
-            # image_url = self._generate_recipe_image(image_prompt)
-            image_url = ""
-            
+            try:
+                recipe_data = self._parse_recipe_response(recipe_text)
+            except Exception:
+                recipe_data = await self._get_default_recipe()
+
+            # Collect the pre-generated image (already in flight since before the chat call)
+            image_url = await image_task if image_task else ""
+
             # Add the generated image URL only if it's not empty
             if image_url:
                 recipe_data["image_url"] = image_url
             else:
                 recipe_data["image_url"] = ""
-            
+
+            # Store the fresh recipe in the semantic cache for future near-identical contexts
+            if context_embedding:
+                response_cache.put(context_embedding, recipe_data, namespace=cache_namespace, text=context)
+
             # Add metadata
             recipe_data["user_id"] = user_profile["student_id"]
-            recipe_data["generated_at"] = datetime.utcnow()
-            
+            recipe_data["generated_at"] = now
+
             return recipe_data
-            
+
         except Exception as e:
-            return self._get_fallback_recipe(user_profile)
-    
+            # Reap the in-flight image render before falling back: an
+            # abandoned task would raise an un-retrieved exception, and the
+            # paid image can seed the fallback instead of a second render
+            image_url = ""
+            if image_task is not None:
+                try:
+                    image_url = await image_task
+                except Exception:
+                    image_url = ""
+            return await self._get_fallback_recipe(user_profile, image_url=image_url)
+
+    async def _get_context_embedding(self, context: str) -> List[float]:
+        #Embed the generation context for semantic cache lookups. Returns [] on failure so callers skip the cache.
+
+        try:
+            response = await self.client.embeddings.create(
+                model="text-embedding-3-small",
+                input=context
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Error embedding context for semantic cache: {e}")
+            return []
+
+    def _build_messages(self, context: str) -> List[Dict[str, str]]:
+        #Build the chat messages for recipe generation. Shared between the interactive path and the Batch API path.
+        #The system prompt is a byte-identical module constant so OpenAI prompt caching can reuse the prefix.
+
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": f"Generate a personalized recipe based on this context: {context}"}
+        ]
+
+    async def create_recipe_batch(self, user_profiles: List[Dict[str, Any]], similar_recipes_by_user: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> str:
+        #Submit a non-interactive recipe generation job via the OpenAI Batch API.
+
+        #Args: user_profiles (List[Dict[str, Any]]): User profiles to generate recipes for
+        #similar_recipes_by_user (Optional[Dict[str, List]]): Similar recipes keyed by student_id
+
+        #Returns: str: The OpenAI batch ID to poll with get_recipe_batch
+
+        similar_recipes_by_user = similar_recipes_by_user or {}
+
+        # Build one JSONL row per user, keyed by student_id for result dispatch
+        lines = []
+        for profile in user_profiles:
+            context = self._create_context(profile, similar_recipes_by_user.get(profile.get("student_id"), []))
+            lines.append(orjson.dumps({
+                "custom_id": profile["student_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": settings.OPENAI_MODEL,
+                    "messages": self._build_messages(context),
+                    "response_format": _RECIPE_RESPONSE_FORMAT,
+                    "prompt_cache_key": "recipe_v1",
+                    "temperature": 0.8,
+                    "max_tokens": 1500
+                }
+            }).decode())
+
+        # Upload the JSONL payload and create the batch (24h completion window)
+        batch_file = await self.client.files.create(
+            file=("recipes_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        logger.info("Submitted recipe batch %s with %d requests", batch.id, len(lines))
+        return batch.id
+
+    async def get_recipe_batch(self, batch_id: str) -> Dict[str, Any]:
+        #Retrieve a recipe generation batch. Returns status and, once completed, the parsed recipes.
+
+        #Args: batch_id (str): Batch ID returned by create_recipe_batch
+
+        #Returns: Dict[str, Any]: Batch status plus parsed recipes keyed by user when completed
+
+        batch = await self.client.batches.retrieve(batch_id)
+        result = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "recipes": []
+        }
+
+        if batch.status == "completed" and batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                # Struct view decodes only the fields we read, straight from bytes
+                row = batch_output_row_decoder.decode(line)
+                if not row.response or not row.response.body or not row.response.body.choices:
+                    continue
+                recipe_text = row.response.body.choices[0].message.content
+                try:
+                    recipe_data = self._parse_recipe_response(recipe_text)
+                except Exception:
+                    recipe_data = await self._get_default_recipe()
+                recipe_data["user_id"] = row.custom_id
+                recipe_data["generated_at"] = datetime.now(timezone.utc)
+                recipe_data["image_url"] = recipe_data.get("image_url", "")
+                result["recipes"].append(recipe_data)
+
+        return result
+
+    def _build_image_seed_prompt(self, user_profile: Dict[str, Any]) -> str:
+        #Seed the image prompt from the user's favorites so rendering can start before the recipe text exists.
+
+        favorite_foods = user_profile.get('favorite_foods', [])
+        if favorite_foods:
+            primary_food = favorite_foods[self._daily_favorite_index(user_profile.get("student_id", ""), len(favorite_foods))]
+        else:
+            primary_food = "home-cooked dish"
+        return f"A delicious {primary_food} served on a plate with garnishes, appetizing presentation"
+
+    @staticmethod
+    def _daily_favorite_index(student_id: str, count: int) -> int:
+        #Stable per-user, per-day index into favorite_foods. Uses crc32 rather than
+        #hash() because the latter is salted per process and would break cache hits
+        #across workers.
+
+        seed = f"{student_id}:{date.today().isoformat()}".encode()
+        return zlib.crc32(seed) % count
+
     def _create_context(self, user_profile: Dict[str, Any], similar_recipes: List[Dict[str, Any]]) -> str:
         """Create context string for recipe generation"""
         context_parts = []
@@ -117,8 +447,11 @@ Guidelines for better recipe creation:
         # User preferences - extract only one favorite food and dietary preferences
         favorite_foods = user_profile.get('favorite_foods', [])
         if favorite_foods:
-            # Randomly select one favorite food item for recipe generation
-            primary_food = random.choice(favorite_foods)
+            # Deterministic daily rotation instead of random.choice: the same user gets the
+            # same context within a day (so prompt and semantic caches hit) but still sees
+            # a different favorite over time
+            idx = self._daily_favorite_index(user_profile.get("student_id", ""), len(favorite_foods))
+            primary_food = favorite_foods[idx]
             context_parts.append(f"User's primary favorite food: {primary_food}")
         else:
             context_parts.append("User's favorite foods: Not specified")
@@ -145,121 +478,99 @@ Guidelines for better recipe creation:
         
         return "\n".join(context_parts)
     
-    def _generate_recipe_image(self, image_prompt: str) -> str:
+    async def _generate_recipe_image(self, image_prompt: str, size: str = None) -> str:
         """
-        Generate an image URL using OpenAI's DALL-E model based on the image prompt.
-        
+        Generate a recipe image using the configured OpenAI image model.
+
         Args:
             image_prompt (str): Detailed description of the dish to generate
-            
+            size (str, optional): Image size; defaults to the preview IMAGE_SIZE
+
         Returns:
-            str: URL of the generated image, or empty string if generation fails
+            str: URL (or data URI) of the generated image, or empty string if generation fails
         """
         try:
-            # Generate image using DALL-E
-            response = self.client.images.generate(
-                model="dall-e-3",  # Use DALL-E 3 for high quality images
+            size = size or settings.IMAGE_SIZE
+
+            # Recipe image prompts have a limited vocabulary ("A delicious X served on a
+            # plate..."), so near-identical prompts recur; reuse yesterday's render
+            # instead of paying for a new one. Namespaced per size.
+            cache_namespace = f"image:{size}"
+            cached_image = response_cache.search_exact(image_prompt, namespace=cache_namespace)
+            prompt_embedding: List[float] = []
+            if not cached_image:
+                prompt_embedding = await self._get_context_embedding(image_prompt)
+                if prompt_embedding:
+                    cached_image = response_cache.search(
+                        prompt_embedding,
+                        namespace=cache_namespace,
+                        threshold=settings.IMAGE_CACHE_THRESHOLD
+                    )
+            if cached_image:
+                return cached_image.get("url", "")
+
+            # Small previews by default; high-res is generated on demand via ensure_hires
+            response = await self.client.images.generate(
+                model=settings.IMAGE_MODEL,
                 prompt=image_prompt,
-                size="1024x1024",  # Standard size for recipe images
-                quality="standard",
+                size=size,
                 n=1  # Generate one image
             )
-            
-            # Extract the image URL from the response
+
+            # Extract the image from the response (gpt-image-1 returns base64, DALL-E returns a URL)
+            image_url = ""
             if response.data and len(response.data) > 0:
-                image_url = response.data[0].url
-                return image_url
-            else:
-                return ""
-            
+                image = response.data[0]
+                if getattr(image, "url", None):
+                    image_url = image.url
+                elif getattr(image, "b64_json", None):
+                    image_url = f"data:image/png;base64,{image.b64_json}"
+
+            if image_url and prompt_embedding:
+                response_cache.put(prompt_embedding, {"url": image_url}, namespace=cache_namespace, text=image_prompt)
+
+            return image_url
+
         except Exception as e:
             return ""  # Return empty string if image generation fails
+
+    async def ensure_hires(self, image_prompt: str) -> str:
+        """
+        Generate a high-resolution render of a recipe image on demand.
+
+        Called only when the client opens the recipe detail view, so the
+        interactive path never pays full-size image cost or latency.
+
+        Args:
+            image_prompt (str): The recipe's stored image prompt
+
+        Returns:
+            str: URL (or data URI) of the high-res image, or empty string on failure
+        """
+        return await self._generate_recipe_image(image_prompt, size=settings.IMAGE_HIRES_SIZE)
     
     def _parse_recipe_response(self, response_text: str) -> Dict[str, Any]:
         """Parse OpenAI response into structured recipe data"""
         try:
-            # Try to extract JSON from the response
-            import json
-            import re
-            
-            # Find JSON-like content
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                recipe_json = json.loads(json_match.group())
-                
-                # Ensure image_prompt is present
-                if 'image_prompt' not in recipe_json:
-                    recipe_name = recipe_json.get('recipe_name', 'Recipe')
-                    recipe_json['image_prompt'] = f"A delicious {recipe_name.lower()} served on a plate with garnishes"
-                
-                # Ensure serving_size is present
-                if 'serving_size' not in recipe_json:
-                    recipe_json['serving_size'] = "1 serving"
-                
-                # Ensure nutritional_facts is present
-                if 'nutritional_facts' not in recipe_json:
-                    recipe_json['nutritional_facts'] = {
-                        "calories": 300,
-                        "protein": "10g",
-                        "carbohydrates": "40g",
-                        "fat": "10g",
-                        "fiber": "5g",
-                        "sugar": "3g",
-                        "sodium": "300mg"
-                    }
-                
-                return recipe_json
-            else:
-                # Fallback parsing
-                return self._fallback_parse(response_text)
-                
+            # Structured outputs guarantee well-formed JSON matching RECIPE_JSON_SCHEMA,
+            # so the response decodes directly — no regex extraction needed
+            return orjson.loads(response_text)
         except Exception as e:
-            return self._get_default_recipe()
-    
-    def _fallback_parse(self, text: str) -> Dict[str, Any]:
-        """Fallback parsing for non-JSON responses"""
-        # Simple parsing for common patterns
-        lines = text.split('\n')
-        recipe_data = {
-            "recipe_name": "Simple Recipe",
-            "ingredients": [],
-            "instructions": [],
-            "cooking_time": "30 minutes",
-            "difficulty": "Medium",
-            "servings": 4,
-            "serving_size": "1 serving",
-            "dietary_tags": [],
-            "nutritional_facts": {
-                "calories": 300,
-                "protein": "10g",
-                "carbohydrates": "40g",
-                "fat": "10g",
-                "fiber": "5g",
-                "sugar": "3g",
-                "sodium": "300mg"
-            },
-            "image_prompt": "A delicious homemade dish served on a plate"
-        }
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Ingredients:"):
-                # Parse ingredients
-                pass
-            elif line.startswith("Instructions:"):
-                # Parse instructions
-                pass
-            elif "ingredients" in line.lower():
-                # Extract ingredients
-                pass
-        
-        return recipe_data
-    
-    def _get_fallback_recipe(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a fallback recipe when AI generation fails"""
+            logger.error(f"Error parsing recipe response: {e}")
+            raise
+
+    async def _get_fallback_recipe(self, user_profile: Dict[str, Any], image_url: str = "") -> Dict[str, Any]:
+        """Generate a fallback recipe when AI generation fails.
+
+        An image_url already rendered by the failed attempt is reused
+        instead of paying for a second generation.
+        """
         # Generate fallback recipe structure
         favorite_foods = user_profile.get('favorite_foods', [])
-        primary_food = random.choice(favorite_foods) if favorite_foods else 'Recipe'
+        if favorite_foods:
+            primary_food = favorite_foods[self._daily_favorite_index(user_profile.get("student_id", ""), len(favorite_foods))]
+        else:
+            primary_food = 'Recipe'
         
         fallback_recipe = {
             "recipe_name": f"Simple {primary_food}",
@@ -285,19 +596,21 @@ Guidelines for better recipe creation:
             },
             "image_prompt": f"A delicious {primary_food} served on a plate",
             "user_id": user_profile["student_id"],
-            "generated_at": datetime.utcnow()
+            "generated_at": datetime.now(timezone.utc)
         }
         
-        # Try to generate image for fallback recipe
-        try:
-            image_url = self._generate_recipe_image(fallback_recipe["image_prompt"])
-            fallback_recipe["image_url"] = image_url
-        except Exception as e:
-            fallback_recipe["image_url"] = ""
-        
+        # Try to generate image for fallback recipe (unless one was already
+        # rendered by the failed attempt)
+        fallback_recipe["image_url"] = image_url
+        if settings.GENERATE_IMAGES and not image_url:
+            try:
+                fallback_recipe["image_url"] = await self._generate_recipe_image(fallback_recipe["image_prompt"])
+            except Exception as e:
+                fallback_recipe["image_url"] = ""
+
         return fallback_recipe
     
-    def _get_default_recipe(self) -> Dict[str, Any]:
+    async def _get_default_recipe(self) -> Dict[str, Any]:
         """Get a default recipe structure"""
         # Generate default recipe structure
         default_recipe = {
@@ -324,15 +637,16 @@ Guidelines for better recipe creation:
                 "sodium": "250mg"
             },
             "image_prompt": "A simple pasta dish with olive oil, garlic, and herbs served on a white plate",
-            "generated_at": datetime.utcnow()
+            "generated_at": datetime.now(timezone.utc)
         }
         
         # Try to generate image for default recipe
-        try:
-            image_url = self._generate_recipe_image(default_recipe["image_prompt"])
-            default_recipe["image_url"] = image_url
-        except Exception as e:
-            default_recipe["image_url"] = ""
+        default_recipe["image_url"] = ""
+        if settings.GENERATE_IMAGES:
+            try:
+                default_recipe["image_url"] = await self._generate_recipe_image(default_recipe["image_prompt"])
+            except Exception as e:
+                default_recipe["image_url"] = ""
         
         return default_recipe
 
@@ -17,7 +17,39 @@ class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = "gpt-4o"  # Using GPT-4o for better recipe generation and reasoning
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))  # Cap on concurrent OpenAI calls
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))  # Retries for rate-limit/server errors
     
+    # Image Generation Configuration
+    GENERATE_IMAGES: bool = os.getenv("GENERATE_IMAGES", "false").lower() == "true"  # Generate recipe images alongside text
+    IMAGE_MODEL: str = os.getenv("IMAGE_MODEL", "gpt-image-1")  # Faster and cheaper than DALL-E 3
+    IMAGE_SIZE: str = os.getenv("IMAGE_SIZE", "1024x1024")  # Smallest size gpt-image-1 accepts; high-res only on demand
+    IMAGE_HIRES_SIZE: str = os.getenv("IMAGE_HIRES_SIZE", "1536x1024")  # Size for on-demand high-res renders
+    IMAGE_CACHE_THRESHOLD: float = float(os.getenv("IMAGE_CACHE_THRESHOLD", "0.92"))  # Min similarity to reuse a rendered image
+
+    # PDF Processing Configuration
+    PDF_CHUNK_CHARS: int = int(os.getenv("PDF_CHUNK_CHARS", "8000"))  # Max characters per LLM parsing chunk
+
+    # User Cache Configuration
+    USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", "30"))  # User profile cache lifetime in seconds
+
+    # Embedding Configuration
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # ~5x cheaper than ada-002
+    EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "512"))  # Reduced dims: 3x less storage/bandwidth
+
+    # Local Vector Index Configuration
+    FAISS_INDEX_PATH: str = os.getenv("FAISS_INDEX_PATH", "index.faiss")  # Persisted local HNSW mirror
+    EMBEDDING_DB_PATH: str = os.getenv("EMBEDDING_DB_PATH", "embedding_cache.db")  # Durable recipe-embedding cache
+
+    # Embedding Cache Configuration
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))  # Max cached query embeddings
+    EMBEDDING_CACHE_TTL: int = int(os.getenv("EMBEDDING_CACHE_TTL", "3600"))  # Embedding cache entry lifetime in seconds
+
+    # Semantic Cache Configuration
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))  # Min cosine similarity for a hit
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # Entry lifetime in seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))  # Cache capacity
+
     # FastAPI Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
@@ -25,7 +57,7 @@ class Settings:
     # Application Configuration
     APP_NAME: str = "Recipe Recommendation MVP"
     APP_VERSION: str = "1.0.0"
-    DEBUG: bool = True
+    DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
 
 # Create settings instance
 settings = Settings() 
\ No newline at end of file
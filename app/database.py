@@ -1,9 +1,11 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, ReturnDocument
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from datetime import datetime
+from cachetools import TTLCache
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from .config import settings
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -12,22 +14,29 @@ class MongoDB:
         self.client = None
         self.db = None
         self.collection = None
-        self.connect()
-    
-    def connect(self):
-        """Establish connection to MongoDB"""
+        # Short-lived user profile cache: bursts from the same user (frontend
+        # polling, retries) hit memory instead of MongoDB
+        self._user_cache = TTLCache(maxsize=10_000, ttl=settings.USER_CACHE_TTL)
+        self._user_cache_lock = threading.Lock()
+
+    async def connect(self):
+        """Establish connection to MongoDB (called from app startup)"""
         try:
             if not settings.MONGODB_URI:
                 raise ValueError("MONGODB_URI not configured")
-            
-            self.client = MongoClient(settings.MONGODB_URI)
+
+            self.client = AsyncMongoClient(settings.MONGODB_URI)
             # Test the connection
-            self.client.admin.command('ping')
+            await self.client.admin.command('ping')
             
             self.db = self.client[settings.MONGODB_DATABASE]
             self.collection = self.db[settings.MONGODB_COLLECTION]
-            
+
             logger.info("Successfully connected to MongoDB")
+
+            # One-time schema migration, once per cold start instead of
+            # per-user writes on the read path
+            await self.migrate_favorite_foods()
             
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
@@ -36,33 +45,48 @@ class MongoDB:
             logger.error(f"Unexpected error connecting to MongoDB: {e}")
             raise
     
-    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def migrate_favorite_foods(self):
+        """Migrate legacy favorite_food fields to favorite_foods in one round trip"""
+        try:
+            result = await self.collection.update_many(
+                {"favorite_food": {"$exists": True}, "favorite_foods": {"$exists": False}},
+                [
+                    {"$set": {"favorite_foods": ["$favorite_food"]}},
+                    {"$unset": "favorite_food"}
+                ]
+            )
+            if result.modified_count > 0:
+                logger.info(f"Migrated {result.modified_count} users from favorite_food to favorite_foods")
+        except Exception as e:
+            logger.error(f"Error migrating favorite_food fields: {e}")
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve user profile by student_id"""
         try:
-            user = self.collection.find_one({"student_id": user_id})
-            
-            # Handle migration from favorite_food to favorite_foods
-            if user and 'favorite_food' in user and 'favorite_foods' not in user:
-                user['favorite_foods'] = [user['favorite_food']]
-                del user['favorite_food']
-                # Update the user in database
-                self.create_or_update_user(user)
-                logger.info(f"Migrated user {user_id} from favorite_food to favorite_foods")
-            
+            with self._user_cache_lock:
+                cached = self._user_cache.get(user_id)
+            if cached is not None:
+                return dict(cached)
+
+            user = await self.collection.find_one({"student_id": user_id})
+            if user:
+                user.setdefault('favorite_foods', [])
+                with self._user_cache_lock:
+                    self._user_cache[user_id] = dict(user)
             return user
         except Exception as e:
             logger.error(f"Error retrieving user {user_id}: {e}")
             return None
     
-    def create_or_update_user(self, user_data: Dict[str, Any]) -> bool:
+    async def create_or_update_user(self, user_data: Dict[str, Any]) -> bool:
         """Create or update user profile"""
         try:
             # Add timestamps
-            now = datetime.utcnow()
+            now = datetime.now(timezone.utc)
             user_data["updated_at"] = now
-            
+
             # Use upsert to create or update
-            result = self.collection.update_one(
+            result = await self.collection.update_one(
                 {"student_id": user_data["student_id"]},
                 {
                     "$set": user_data,
@@ -71,37 +95,71 @@ class MongoDB:
                 upsert=True
             )
             
-            logger.info(f"User {user_data['student_id']} {'created' if result.upserted_id else 'updated'}")
+            # Invalidate the cached profile so the next read sees this write
+            with self._user_cache_lock:
+                self._user_cache.pop(user_data["student_id"], None)
+
+            logger.info("User %s %s", user_data['student_id'], 'created' if result.upserted_id else 'updated')
             return True
             
         except Exception as e:
             logger.error(f"Error creating/updating user: {e}")
             return False
     
-    def get_all_users(self) -> List[Dict[str, Any]]:
+    async def upsert_user_atomic(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create or update a user and return the post-write document in one round trip.
+
+        Uses find_one_and_update with an aggregation-pipeline update, so the
+        write, the legacy favorite_food migration and the read-back happen
+        atomically instead of as three separate round trips.
+        """
+        try:
+            now = datetime.now(timezone.utc)
+
+            # Pipeline $set values are expressions, so user-supplied strings
+            # beginning with "$" would be evaluated as field paths; $literal
+            # keeps the plain update-document's store-as-given semantics
+            update_doc = {
+                k: {"$literal": v} for k, v in user_data.items() if k != "favorite_food"
+            }
+            update_doc["updated_at"] = now
+            update_doc["created_at"] = {"$ifNull": ["$created_at", now]}
+            if "favorite_foods" not in update_doc:
+                legacy = [user_data["favorite_food"]] if user_data.get("favorite_food") else []
+                update_doc["favorite_foods"] = {"$ifNull": ["$favorite_foods", {"$literal": legacy}]}
+
+            user = await self.collection.find_one_and_update(
+                {"student_id": user_data["student_id"]},
+                [{"$set": update_doc}, {"$unset": "favorite_food"}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+
+            if user:
+                user.setdefault('favorite_foods', [])
+                # Write-through: refresh the cached profile with the new state
+                with self._user_cache_lock:
+                    self._user_cache[user_data["student_id"]] = dict(user)
+
+            logger.info("User %s upserted", user_data['student_id'])
+            return user
+
+        except Exception as e:
+            logger.error(f"Error upserting user: {e}")
+            return None
+
+    async def get_all_users(self) -> List[Dict[str, Any]]:
         """Retrieve all user profiles"""
         try:
-            users = list(self.collection.find({}))
-            
-            # Handle migration for all users
-            migrated_count = 0
+            users = await self.collection.find({}).to_list(length=None)
             for user in users:
-                if 'favorite_food' in user and 'favorite_foods' not in user:
-                    user['favorite_foods'] = [user['favorite_food']]
-                    del user['favorite_food']
-                    # Update the user in database
-                    self.create_or_update_user(user)
-                    migrated_count += 1
-            
-            if migrated_count > 0:
-                logger.info(f"Migrated {migrated_count} users from favorite_food to favorite_foods")
-            
+                user.setdefault('favorite_foods', [])
             return users
         except Exception as e:
             logger.error(f"Error retrieving all users: {e}")
             return []
     
-    def store_conversation_history(self, user_id: str, recipe_data: Dict[str, Any], conversation_id: str = None) -> str:
+    async def store_conversation_history(self, user_id: str, recipe_data: Dict[str, Any], conversation_id: str = None) -> str:
         """
         Store recipe conversation history in MongoDB
         
@@ -114,31 +172,34 @@ class MongoDB:
             str: Conversation ID (new or existing)
         """
         try:
+            # One timestamp per call, shared by the conversation ID and the entry
+            now = datetime.now(timezone.utc)
+
             # Generate conversation ID if not provided
             if not conversation_id:
-                conversation_id = f"conv_{user_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+                conversation_id = f"conv_{user_id}_{now.strftime('%Y%m%d_%H%M%S')}"
             
             # Prepare conversation entry
             conversation_entry = {
                 "conversation_id": conversation_id,
                 "user_id": user_id,
                 "recipe_data": recipe_data,
-                "timestamp": datetime.utcnow(),
+                "timestamp": now,
                 "type": "recipe_generation"
             }
             
             # Store in conversations collection
             conversations_collection = self.db["conversations"]
-            result = conversations_collection.insert_one(conversation_entry)
+            result = await conversations_collection.insert_one(conversation_entry)
             
-            logger.info(f"Stored conversation history for user {user_id}, conversation_id: {conversation_id}")
+            logger.info("Stored conversation history for user %s, conversation_id: %s", user_id, conversation_id)
             return conversation_id
             
         except Exception as e:
             logger.error(f"Error storing conversation history: {e}")
             return conversation_id if conversation_id else ""
     
-    def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Retrieve conversation history for a user
         
@@ -151,19 +212,42 @@ class MongoDB:
         """
         try:
             conversations_collection = self.db["conversations"]
-            conversations = list(conversations_collection.find(
+            conversations = await conversations_collection.find(
                 {"user_id": user_id},
                 {"_id": 0}  # Exclude MongoDB _id field
-            ).sort("timestamp", -1).limit(limit))
+            ).sort("timestamp", -1).limit(limit).to_list(length=limit)
             
-            logger.info(f"Retrieved {len(conversations)} conversations for user {user_id}")
+            logger.info("Retrieved %d conversations for user %s", len(conversations), user_id)
             return conversations
             
         except Exception as e:
             logger.error(f"Error retrieving conversation history: {e}")
             return []
     
-    def get_conversation_by_id(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+    async def get_conversation_history_stamp(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get the latest conversation timestamp and total count for a user
+
+        Cheap change marker for ETag computation: fetches one projected
+        document plus a count instead of the full history.
+        """
+        try:
+            conversations_collection = self.db["conversations"]
+            latest = await conversations_collection.find_one(
+                {"user_id": user_id},
+                {"timestamp": 1, "_id": 0},
+                sort=[("timestamp", -1)]
+            )
+            count = await conversations_collection.count_documents({"user_id": user_id})
+            return {
+                "latest": latest["timestamp"] if latest else None,
+                "count": count
+            }
+        except Exception as e:
+            logger.error(f"Error getting conversation stamp for user {user_id}: {e}")
+            return {"latest": None, "count": 0}
+
+    async def get_conversation_by_id(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve a specific conversation by ID
         
@@ -175,7 +259,7 @@ class MongoDB:
         """
         try:
             conversations_collection = self.db["conversations"]
-            conversation = conversations_collection.find_one(
+            conversation = await conversations_collection.find_one(
                 {"conversation_id": conversation_id},
                 {"_id": 0}  # Exclude MongoDB _id field
             )
@@ -186,7 +270,7 @@ class MongoDB:
             logger.error(f"Error retrieving conversation {conversation_id}: {e}")
             return None
     
-    def get_user_conversations_summary(self, user_id: str) -> Dict[str, Any]:
+    async def get_user_conversations_summary(self, user_id: str) -> Dict[str, Any]:
         """
         Get summary of user's conversation history
         
@@ -200,13 +284,13 @@ class MongoDB:
             conversations_collection = self.db["conversations"]
             
             # Get total count
-            total_conversations = conversations_collection.count_documents({"user_id": user_id})
-            
+            total_conversations = await conversations_collection.count_documents({"user_id": user_id})
+
             # Get recent conversations
-            recent_conversations = list(conversations_collection.find(
+            recent_conversations = await conversations_collection.find(
                 {"user_id": user_id},
                 {"recipe_data.recipe_name": 1, "timestamp": 1, "conversation_id": 1, "_id": 0}
-            ).sort("timestamp", -1).limit(5))
+            ).sort("timestamp", -1).limit(5).to_list(length=5)
             
             # Get unique recipe types
             pipeline = [
@@ -216,7 +300,8 @@ class MongoDB:
                 {"$limit": 10}
             ]
             
-            recipe_types = list(conversations_collection.aggregate(pipeline))
+            cursor = await conversations_collection.aggregate(pipeline)
+            recipe_types = await cursor.to_list(length=None)
             
             summary = {
                 "user_id": user_id,
@@ -236,10 +321,10 @@ class MongoDB:
                 "popular_recipe_types": []
             }
     
-    def close(self):
+    async def close(self):
         """Close MongoDB connection"""
         if self.client:
-            self.client.close()
+            await self.client.close()
             logger.info("MongoDB connection closed")
 
 # Create global MongoDB instance
@@ -0,0 +1,80 @@
+from typing import Tuple
+import numpy as np
+
+# Numba JITs the heap selection to native code (cached on disk after the
+# first compile). Optional: the argpartition path below is the fallback.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _topk_heap(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Min-heap of size k over scores; single pass, no full-array partition.
+
+    For the small arrays on our hot paths (N < 10k, k < 20) this beats
+    np.argpartition, which allocates and writes the whole partitioned array.
+    """
+    n = scores.shape[0]
+    heap_scores = np.empty(k, dtype=np.float32)
+    heap_indexes = np.empty(k, dtype=np.int64)
+    size = 0
+    for i in range(n):
+        value = scores[i]
+        if size < k:
+            # Push and sift up
+            heap_scores[size] = value
+            heap_indexes[size] = i
+            child = size
+            size += 1
+            while child > 0:
+                parent = (child - 1) // 2
+                if heap_scores[child] >= heap_scores[parent]:
+                    break
+                heap_scores[child], heap_scores[parent] = heap_scores[parent], heap_scores[child]
+                heap_indexes[child], heap_indexes[parent] = heap_indexes[parent], heap_indexes[child]
+                child = parent
+        elif value > heap_scores[0]:
+            # Replace the current minimum and sift down
+            heap_scores[0] = value
+            heap_indexes[0] = i
+            parent = 0
+            while True:
+                left = 2 * parent + 1
+                right = left + 1
+                smallest = parent
+                if left < size and heap_scores[left] < heap_scores[smallest]:
+                    smallest = left
+                if right < size and heap_scores[right] < heap_scores[smallest]:
+                    smallest = right
+                if smallest == parent:
+                    break
+                heap_scores[parent], heap_scores[smallest] = heap_scores[smallest], heap_scores[parent]
+                heap_indexes[parent], heap_indexes[smallest] = heap_indexes[smallest], heap_indexes[parent]
+                parent = smallest
+
+    order = np.argsort(heap_scores[:size])[::-1]
+    return heap_indexes[:size][order], heap_scores[:size][order]
+
+
+if numba is not None:
+    _topk_heap = numba.njit(cache=True, fastmath=True)(_topk_heap)
+
+
+def topk(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and values of the k largest scores, sorted best-first."""
+    scores = np.ascontiguousarray(scores, dtype=np.float32)
+    if k >= scores.shape[0]:
+        order = np.argsort(scores)[::-1]
+        return order, scores[order]
+    if numba is not None:
+        return _topk_heap(scores, k)
+    partition = np.argpartition(scores, -k)[-k:]
+    order = partition[np.argsort(scores[partition])[::-1]]
+    return order, scores[order]
+
+
+# Trigger compilation (and the on-disk cache) at import so the first
+# request doesn't pay the JIT cost
+if numba is not None:
+    topk(np.zeros(2, dtype=np.float32), 1)
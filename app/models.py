@@ -32,6 +32,9 @@ class RecipeResponse(BaseModel):
     conversation_id: str
     generated_at: datetime
 
+class RecipeBatchRequest(BaseModel):
+    user_ids: List[str] = Field(..., description="Student IDs to generate recipes for in the batch job")
+
 class ErrorResponse(BaseModel):
     error: str
     message: str
@@ -0,0 +1,36 @@
+"""
+msgspec.Struct views of the hot request/response DTOs.
+
+These decode straight from bytes without Pydantic's per-field validator
+dispatch, and only declare the fields the hot paths actually read. Pydantic
+models in app/models.py stay at the FastAPI boundary for OpenAPI docs.
+"""
+import msgspec
+from typing import List, Optional
+
+class UserProfile(msgspec.Struct, frozen=True, gc=False):
+    student_id: str
+    name: str
+    favorite_foods: List[str] = []
+    dietary_preferences: List[str] = []
+
+class ChatMessageView(msgspec.Struct, gc=False):
+    content: str = ""
+
+class ChatChoiceView(msgspec.Struct, gc=False):
+    message: ChatMessageView = msgspec.field(default_factory=ChatMessageView)
+
+class ChatCompletionBodyView(msgspec.Struct, gc=False):
+    choices: List[ChatChoiceView] = []
+
+class BatchRowResponseView(msgspec.Struct, gc=False):
+    body: Optional[ChatCompletionBodyView] = None
+
+class BatchOutputRowView(msgspec.Struct, gc=False):
+    # One JSONL row of an OpenAI Batch API output file
+    custom_id: str = ""
+    response: Optional[BatchRowResponseView] = None
+
+# Module-level decoders are reused across calls (decoder construction is the expensive part)
+user_profile_decoder = msgspec.json.Decoder(UserProfile)
+batch_output_row_decoder = msgspec.json.Decoder(BatchOutputRowView)
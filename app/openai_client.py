@@ -0,0 +1,18 @@
+import httpx
+from openai import AsyncOpenAI
+from .config import settings
+
+# Single pooled HTTP client shared by every OpenAI caller in the app.
+# HTTP/2 multiplexing lets concurrent recipe requests share one warm
+# connection instead of paying a TLS handshake per call.
+_http = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    timeout=httpx.Timeout(60.0)
+)
+
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=_http)
+
+async def close():
+    """Close the shared HTTP connection pool (called on app shutdown)"""
+    await _http.aclose()
@@ -1,167 +1,306 @@
-import pdfplumber
-import PyPDF2
+import asyncio
+import os
 import re
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any, Optional
 import logging
 from .config import settings
-from openai import OpenAI
+from .openai_client import client as shared_openai_client
 
 logger = logging.getLogger(__name__)
 
+# Precompiled once at import so the per-line section scan doesn't re-run
+# re.compile (or its cache lookup)
+_SECTION_RE = re.compile(r'(?i)^(recipe|dish|meal|ingredients?|instructions|method|directions)\b')
+
+# JSON Schema enforced server-side via structured outputs; responses are
+# guaranteed to be a well-formed {"recipes": [...]} object
+_PDF_RECIPES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recipes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "ingredients": {"type": "array", "items": {"type": "string"}},
+                    "instructions": {"type": "array", "items": {"type": "string"}},
+                    "cuisine": {"type": "string"},
+                    "difficulty": {"type": "string"},
+                    "cooking_time": {"type": "string"},
+                    "servings": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": [
+                    "name", "ingredients", "instructions", "cuisine",
+                    "difficulty", "cooking_time", "servings", "description"
+                ],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["recipes"],
+    "additionalProperties": False
+}
+
+_RECIPES_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "RecipeList", "schema": _PDF_RECIPES_SCHEMA, "strict": True}
+}
+
+# Static instruction block kept byte-identical across calls so the OpenAI
+# prompt cache can reuse the prefix; the variable PDF text comes last
+_PARSE_SYSTEM_PROMPT = "You are a recipe parser. Extract recipe information and return it as JSON."
+_PARSE_INSTRUCTIONS = """Extract recipe information from the following text.
+Return a JSON object of the form {"recipes": [...]} where each recipe has this structure:
+{
+    "name": "Recipe name",
+    "ingredients": ["ingredient1", "ingredient2", ...],
+    "instructions": ["step1", "step2", ...],
+    "cuisine": "cuisine type",
+    "difficulty": "Easy/Medium/Hard",
+    "cooking_time": "time in minutes",
+    "servings": "number of servings",
+    "description": "brief description"
+}
+
+Text to parse:
+"""
+
+def _extract_text_sync(pdf_path: str) -> str:
+    """Extract text from one PDF. Module-level so it pickles cleanly into worker processes."""
+    try:
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(pdf_path)
+        try:
+            return "\n".join(page.get_text("text") for page in doc)
+        finally:
+            doc.close()
+    except Exception as e:
+        logger.warning(f"PyMuPDF extraction failed for {pdf_path}, falling back to pdfplumber: {e}")
+
+    import pdfplumber
+
+    text = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text += page.extract_text() + "\n"
+    return text
+
+# Shared process pool for CPU-bound extraction, created on first use so
+# API-only workers never fork it
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _pdf_executor
+
+def shutdown_pdf_executor():
+    """Tear down the extraction pool (called from app shutdown)"""
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False)
+        _pdf_executor = None
+
 class PDFRecipeProcessor:
     def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai_client = shared_openai_client
+        # Bound concurrent section-parsing calls against the rate limit
+        self._semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF file"""
+        """Extract text from PDF file using PyMuPDF, falling back to pdfplumber"""
         try:
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            # PyMuPDF (MuPDF C library) is an order of magnitude faster than
+            # pdfplumber's pure-Python extraction, and we only need plain text
+            return _extract_text_sync(pdf_path)
         except Exception as e:
             logger.error(f"Error extracting text from PDF {pdf_path}: {e}")
             raise
     
-    def parse_recipe_from_text(self, text: str) -> List[Dict[str, Any]]:
+    async def slurp_pdfs(self, pdf_paths: List[str]) -> Dict[str, bytes]:
+        """Read many PDF files concurrently without blocking the event loop"""
+        results = await asyncio.gather(
+            *[asyncio.to_thread(self._read_file_sync, path) for path in pdf_paths],
+            return_exceptions=True
+        )
+
+        contents = {}
+        for path, result in zip(pdf_paths, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error reading PDF {path}: {result}")
+            else:
+                contents[path] = result
+        return contents
+
+    @staticmethod
+    def _read_file_sync(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def extract_text_from_pdf_bytes(self, data: bytes) -> str:
+        """Extract text from in-memory PDF bytes (pairs with slurp_pdfs)"""
+        try:
+            import fitz  # PyMuPDF
+
+            doc = fitz.open(stream=data, filetype="pdf")
+            try:
+                return "\n".join(page.get_text("text") for page in doc)
+            finally:
+                doc.close()
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF bytes: {e}")
+            raise
+
+    async def parse_recipe_from_text(self, text: str) -> List[Dict[str, Any]]:
         """Parse recipe information from extracted text using OpenAI"""
         try:
-            prompt = f"""
-            Extract recipe information from the following text and format it as JSON.
-            If there are multiple recipes, return a JSON array. If there's only one recipe, return a JSON object.
-            
-            For multiple recipes, use this structure:
-            [
-                {{
-                    "name": "Recipe name",
-                    "ingredients": ["ingredient1", "ingredient2", ...],
-                    "instructions": ["step1", "step2", ...],
-                    "cuisine": "cuisine type",
-                    "difficulty": "Easy/Medium/Hard",
-                    "cooking_time": "time in minutes",
-                    "servings": "number of servings",
-                    "description": "brief description"
-                }},
-                ...
-            ]
-            
-            For a single recipe, use this structure:
-            {{
-                "name": "Recipe name",
-                "ingredients": ["ingredient1", "ingredient2", ...],
-                "instructions": ["step1", "step2", ...],
-                "cuisine": "cuisine type",
-                "difficulty": "Easy/Medium/Hard",
-                "cooking_time": "time in minutes",
-                "servings": "number of servings",
-                "description": "brief description"
-            }}
-            
-            Text to parse:
-            {text}
-            
-            Return only the JSON, no additional text.
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a recipe parser. Extract recipe information and return it as JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-            
-            # Extract JSON from response
-            content = response.choices[0].message.content
-            logger.info(f"Raw OpenAI response: {content}")
-            
-            # Try to find JSON in the response (both objects and arrays)
-            json_match = re.search(r'(\[.*\]|\{.*\})', content, re.DOTALL)
-            if json_match:
-                try:
-                    import json
-                    json_str = json_match.group()
-                    parsed_data = json.loads(json_str)
-                    
-                    # Handle both single objects and arrays
-                    if isinstance(parsed_data, list):
-                        # If it's an array, return all items
-                        if len(parsed_data) > 0:
-                            return parsed_data
-                        else:
-                            raise ValueError("Empty array returned")
-                    else:
-                        # If it's a single object, return it as a list
-                        return [parsed_data]
-                        
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e}")
-                    # Try to fix common JSON issues
-                    fixed_json = json_match.group().replace('\n', ' ').replace('  ', ' ')
-                    try:
-                        parsed_data = json.loads(fixed_json)
-                        if isinstance(parsed_data, list):
-                            if len(parsed_data) > 0:
-                                return parsed_data
-                            else:
-                                raise ValueError("Empty array returned")
-                        else:
-                            return [parsed_data]
-                    except json.JSONDecodeError:
-                        logger.error("Failed to fix JSON")
-                        raise ValueError("Invalid JSON format in response")
-            else:
-                raise ValueError("Could not extract JSON from response")
-                
+            # Structured outputs guarantee a well-formed {"recipes": [...]} object,
+            # so no regex extraction or JSON repair is needed
+            recipes = await self._parse_section(text)
+            if not recipes:
+                raise ValueError("No recipes found in text")
+            return recipes
+
         except Exception as e:
             logger.error(f"Error parsing recipe from text: {e}")
             raise
-    
-    def process_pdf_recipes(self, pdf_path: str) -> List[Dict[str, Any]]:
+
+    async def _parse_section(self, section_text: str) -> List[Dict[str, Any]]:
+        """Parse one bounded text section into recipes using strict structured outputs"""
+        try:
+            async with self._semaphore:
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": _PARSE_SYSTEM_PROMPT},
+                        {"role": "user", "content": _PARSE_INSTRUCTIONS + section_text}
+                    ],
+                    temperature=0.0,
+                    response_format=_RECIPES_RESPONSE_FORMAT,
+                    prompt_cache_key="pdf_recipe_parser_v1"
+                )
+
+            parsed = orjson.loads(response.choices[0].message.content)
+            recipes = parsed.get("recipes", [])
+            return recipes if isinstance(recipes, list) else [recipes]
+
+        except Exception as e:
+            logger.error(f"Error parsing recipe section: {e}")
+            return []
+
+    @staticmethod
+    def _chunk_sections(sections: List[str], max_chars: int) -> List[str]:
+        """Pack recipe sections into chunks bounded by max_chars"""
+        chunks = []
+        current = []
+        current_size = 0
+        for section in sections:
+            if current and current_size + len(section) > max_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_size = 0
+            current.append(section)
+            current_size += len(section)
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    async def process_pdf_recipes(self, pdf_path: str) -> List[Dict[str, Any]]:
         """Process PDF and extract multiple recipes"""
         try:
-            text = self.extract_text_from_pdf(pdf_path)
-            
-            # Parse recipes from the entire text
-            recipes = self.parse_recipe_from_text(text)
-            
+            # Extraction is CPU-bound and GIL-heavy; run it in the process
+            # pool so the event loop keeps serving other requests
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(_get_pdf_executor(), _extract_text_sync, pdf_path)
+
+            # Shard large documents into bounded chunks and parse them concurrently;
+            # one mega-prompt risks context overflow and redoing the whole call on failure
+            sections = self.split_into_recipe_sections(text)
+            chunks = self._chunk_sections(sections, settings.PDF_CHUNK_CHARS)
+
+            if len(chunks) > 1:
+                results = await asyncio.gather(*[self._parse_section(chunk) for chunk in chunks])
+                recipes = [recipe for chunk_recipes in results for recipe in chunk_recipes]
+            else:
+                # Small documents keep the single-call path
+                recipes = await self.parse_recipe_from_text(text)
+
             # Add IDs to each recipe
             for i, recipe in enumerate(recipes):
                 recipe["id"] = f"recipe_pdf_{i+1}"
-            
+
             return recipes
-            
+
         except Exception as e:
             logger.error(f"Error processing PDF recipes: {e}")
             raise
     
+    async def process_pdf_recipes_bulk(self, pdf_paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Process many PDFs: CPU-bound extraction in a process pool, LLM parsing overlapped"""
+        try:
+            loop = asyncio.get_running_loop()
+            pool = _get_pdf_executor()
+
+            async def process_one(pdf_path: str) -> List[Dict[str, Any]]:
+                # Text extraction runs in a worker process so parsing of
+                # already-extracted files overlaps with extraction of the rest
+                text = await loop.run_in_executor(pool, _extract_text_sync, pdf_path)
+
+                sections = self.split_into_recipe_sections(text)
+                chunks = self._chunk_sections(sections, settings.PDF_CHUNK_CHARS)
+                results = await asyncio.gather(*[self._parse_section(chunk) for chunk in chunks])
+                return [recipe for chunk_recipes in results for recipe in chunk_recipes]
+
+            results = await asyncio.gather(
+                *[process_one(path) for path in pdf_paths],
+                return_exceptions=True
+            )
+
+            # Merge results preserving the filename -> recipe id mapping
+            recipes_by_file: Dict[str, List[Dict[str, Any]]] = {}
+            for path, result in zip(pdf_paths, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error processing PDF {path}: {result}")
+                    continue
+                stem = os.path.splitext(os.path.basename(path))[0]
+                for i, recipe in enumerate(result):
+                    recipe["id"] = f"recipe_pdf_{stem}_{i+1}"
+                recipes_by_file[path] = result
+
+            return recipes_by_file
+
+        except Exception as e:
+            logger.error(f"Error processing PDF batch: {e}")
+            raise
+
     def split_into_recipe_sections(self, text: str) -> List[str]:
         """Split text into individual recipe sections"""
-        # Common recipe section indicators
-        section_patterns = [
-            r'(?i)(recipe|dish|meal).*?(?=\n\s*\n|\n\s*[A-Z]|\n\s*Recipe|\n\s*Dish|\n\s*Meal)',
-            r'(?i)(ingredients|ingredient).*?(?=\n\s*\n|\n\s*[A-Z]|\n\s*Instructions|\n\s*Method)',
-            r'(?i)(instructions|method|directions).*?(?=\n\s*\n|\n\s*[A-Z]|\n\s*Recipe|\n\s*Dish)'
-        ]
-        
+        # Accumulate lines in a list and join per section; repeated string
+        # concatenation is O(n^2) over a large cookbook's text
         sections = []
-        current_section = ""
-        
+        current_lines = []
+
         lines = text.split('\n')
         for line in lines:
-            # Check if line indicates a new recipe
-            if any(re.search(pattern, line) for pattern in section_patterns):
-                if current_section.strip():
-                    sections.append(current_section.strip())
-                current_section = line
+            # Check if line indicates a new recipe (single precompiled alternation per line)
+            if _SECTION_RE.match(line):
+                current_section = "\n".join(current_lines).strip()
+                if current_section:
+                    sections.append(current_section)
+                current_lines = [line]
             else:
-                current_section += "\n" + line
-        
+                current_lines.append(line)
+
         # Add the last section
-        if current_section.strip():
-            sections.append(current_section.strip())
+        current_section = "\n".join(current_lines).strip()
+        if current_section:
+            sections.append(current_section)
         
         # If no clear sections found, treat entire text as one recipe
         if not sections:
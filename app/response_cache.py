@@ -0,0 +1,209 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+import hashlib
+import logging
+import numpy as np
+from .config import settings
+from .fast_topk import topk
+
+# SimSIMD dispatches AVX-512/NEON cosine kernels - around two orders of
+# magnitude faster than naive f32 loops on high-dim vectors. Optional: the
+# numpy path below is the fallback.
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+logger = logging.getLogger(__name__)
+
+def cosine_topk(query: np.ndarray, matrix: np.ndarray, k: int):
+    """Top-k cosine matches of a query against a contiguous float matrix.
+
+    Returns (indices, scores) sorted best-first. Expects the query to be
+    L2-normalized and matrix rows normalized at insert, so the fallback is a
+    single matrix-vector product. The query is cast to the matrix dtype, so
+    fp16 matrices dispatch to SimSIMD's f16 kernels when available.
+    """
+    query = query.astype(matrix.dtype, copy=False)
+    if simsimd is not None:
+        distances = np.asarray(simsimd.cdist(query[None, :], matrix, metric="cosine"), dtype=np.float32)[0]
+        scores = 1.0 - distances
+    else:
+        scores = (matrix @ query).astype(np.float32)
+
+    # Heap-based selection (JIT-compiled when numba is available)
+    order, _ = topk(scores, k)
+    return order, scores[order]
+
+def _quantize_int8(vector: np.ndarray):
+    """Quantize an L2-normalized vector to int8 with a per-vector scale"""
+    scale = 127.0 / float(np.abs(vector).max() or 1.0)
+    return (vector * scale).round().astype(np.int8), scale
+
+# How many of the most recent entries keep their fp16 row for exact rerank,
+# and how many coarse candidates feed the rerank
+_F16_RESERVOIR = 64
+_RERANK_CANDIDATES = 8
+
+class SemanticCache:
+    """
+    In-process semantic cache for generated responses.
+
+    Lookups run in two tiers: an exact tier keyed on the sha256 of the raw
+    text (identical prompts skip embedding entirely), then a semantic tier
+    over int8-quantized embeddings. Vectors are L2-normalized and quantized
+    with a per-vector scale at insert, cutting memory and bandwidth 4x; the
+    coarse int8 scan picks a handful of candidates which are reranked
+    against a small fp16 reservoir (most recent entries, normalized at
+    insert so cosine is a plain matmul at half the memory bandwidth of
+    fp32) to avoid quantization-induced false negatives. Entries are namespaced (e.g. per
+    dietary profile) and expire after a TTL so stale dietary advice is never
+    served; at capacity the oldest entry is evicted first.
+    """
+
+    def __init__(self, threshold: float = None, ttl_seconds: int = None, max_entries: int = None):
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else settings.SEMANTIC_CACHE_MAX_ENTRIES
+        # Row i of _matrix_i8 pairs with _payloads[i] / _namespaces[i] / etc.
+        self._matrix_i8: Optional[np.ndarray] = None  # (N, dim) int8, quantized normalized rows
+        self._scales: List[float] = []  # per-vector quantization scales
+        self._f16_rows: List[Optional[np.ndarray]] = []  # reservoir: normalized fp16 kept for recent rows only
+        self._payloads: List[Dict[str, Any]] = []
+        self._namespaces: List[str] = []
+        self._stored_at: List[datetime] = []
+        self._exact_keys: List[Optional[str]] = []
+        self._exact: Dict[str, int] = {}  # sha256(namespace:text) -> row index
+
+    @staticmethod
+    def _exact_key(text: str, namespace: str) -> str:
+        return hashlib.sha256(f"{namespace}:{text}".encode()).hexdigest()
+
+    def search_exact(self, text: str, namespace: str = "default") -> Optional[Dict[str, Any]]:
+        """Return the payload stored for this exact text, or None (no embedding needed)"""
+        try:
+            self._evict_expired()
+            index = self._exact.get(self._exact_key(text, namespace))
+            if index is None:
+                return None
+            logger.info("Exact cache hit (namespace: %s)", namespace)
+            return dict(self._payloads[index])
+        except Exception as e:
+            logger.error(f"Error searching exact cache tier: {e}")
+            return None
+
+    def search(self, embedding: List[float], namespace: str = "default", threshold: float = None) -> Optional[Dict[str, Any]]:
+        """Return the cached payload with the highest cosine similarity above threshold, or None"""
+        try:
+            if threshold is None:
+                threshold = self.threshold
+            self._evict_expired()
+
+            if self._matrix_i8 is None or len(self._payloads) == 0:
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            query_norm = float(np.linalg.norm(query))
+            if query_norm == 0:
+                return None
+            query_normalized = query / query_norm
+
+            candidates = [i for i, ns in enumerate(self._namespaces) if ns == namespace]
+            if not candidates:
+                return None
+
+            # Coarse scan over the int8 matrix: integer dot products divided
+            # by the two quantization scales approximate the true cosines
+            query_i8, query_scale = _quantize_int8(query_normalized)
+            candidate_matrix = np.ascontiguousarray(self._matrix_i8[candidates])
+            scales = np.asarray([self._scales[i] for i in candidates], dtype=np.float32)
+            approx = (candidate_matrix.astype(np.int32) @ query_i8.astype(np.int32)) / (scales * query_scale)
+
+            top, _ = topk(approx, _RERANK_CANDIDATES)
+
+            # fp16 rerank for candidates still in the reservoir; older
+            # rows fall back to their approximate score
+            best_score = -1.0
+            best_index = None
+            f16_indexes = [candidates[int(i)] for i in top if self._f16_rows[candidates[int(i)]] is not None]
+            if f16_indexes:
+                reservoir_matrix = np.vstack([self._f16_rows[i] for i in f16_indexes])
+                order, scores = cosine_topk(query_normalized, reservoir_matrix, 1)
+                best_score = float(scores[0])
+                best_index = f16_indexes[int(order[0])]
+            for i in top:
+                global_index = candidates[int(i)]
+                if self._f16_rows[global_index] is None and float(approx[int(i)]) > best_score:
+                    best_score = float(approx[int(i)])
+                    best_index = global_index
+
+            if best_index is not None and best_score >= threshold:
+                logger.info("Semantic cache hit (score: %.3f, namespace: %s)", best_score, namespace)
+                return dict(self._payloads[best_index])
+
+            return None
+
+        except Exception as e:
+            logger.error(f"Error searching semantic cache: {e}")
+            return None
+
+    def put(self, embedding: List[float], payload: Dict[str, Any], namespace: str = "default", text: str = None):
+        """Store a payload under its embedding, evicting the oldest entry when full"""
+        try:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            if norm == 0:
+                return
+
+            if len(self._payloads) >= self.max_entries:
+                self._drop_rows({0})
+
+            normalized = vector / norm
+            quantized, scale = _quantize_int8(normalized)
+            row = quantized[None, :]
+            self._matrix_i8 = row if self._matrix_i8 is None else np.vstack([self._matrix_i8, row])
+            self._scales.append(scale)
+            self._f16_rows.append(normalized.astype(np.float16))
+            self._payloads.append(dict(payload))
+            self._namespaces.append(namespace)
+            self._stored_at.append(datetime.now(timezone.utc))
+
+            # Age the fp16 reservoir: only the most recent rows keep exact copies
+            reservoir_cutoff = len(self._payloads) - 1 - _F16_RESERVOIR
+            if reservoir_cutoff >= 0:
+                self._f16_rows[reservoir_cutoff] = None
+
+            exact_key = self._exact_key(text, namespace) if text is not None else None
+            self._exact_keys.append(exact_key)
+            if exact_key is not None:
+                self._exact[exact_key] = len(self._payloads) - 1
+
+        except Exception as e:
+            logger.error(f"Error storing entry in semantic cache: {e}")
+
+    def _evict_expired(self):
+        """Drop entries older than the TTL"""
+        if not self._payloads:
+            return
+        now = datetime.now(timezone.utc)
+        expired = {
+            i for i, stored_at in enumerate(self._stored_at)
+            if (now - stored_at).total_seconds() >= self.ttl_seconds
+        }
+        if expired:
+            self._drop_rows(expired)
+
+    def _drop_rows(self, indexes: set):
+        """Remove rows from the matrix and all parallel structures"""
+        keep = [i for i in range(len(self._payloads)) if i not in indexes]
+        self._matrix_i8 = self._matrix_i8[keep] if keep else None
+        self._scales = [self._scales[i] for i in keep]
+        self._f16_rows = [self._f16_rows[i] for i in keep]
+        self._payloads = [self._payloads[i] for i in keep]
+        self._namespaces = [self._namespaces[i] for i in keep]
+        self._stored_at = [self._stored_at[i] for i in keep]
+        self._exact_keys = [self._exact_keys[i] for i in keep]
+        self._exact = {key: i for i, key in enumerate(self._exact_keys) if key is not None}
+
+# Create global response cache instance
+response_cache = SemanticCache()
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, status
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, File, Depends, status
 from typing import List, Dict, Any
 import logging
-from ..models import RecipeResponse, ConversationHistoryResponse, ConversationSummaryResponse
+from ..models import RecipeResponse, RecipeBatchRequest, ConversationHistoryResponse, ConversationSummaryResponse
 from ..vector_store import vector_store
 from ..pdf_processor import pdf_processor
 from ..ai_service import ai_service
 from ..database import mongodb
+import asyncio
+import hashlib
 import tempfile
 import os
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/recipe", tags=["recipes"])
@@ -19,7 +23,7 @@ async def search_recipes(query: str, top_k: int = 5):
     Search for recipes using semantic similarity
     """
     try:
-        recipes = vector_store.search_similar_recipes(query, top_k)
+        recipes = await vector_store.search_similar_recipes(query, top_k)
         return {
             "query": query,
             "results": recipes,
@@ -31,29 +35,110 @@ async def search_recipes(query: str, top_k: int = 5):
 
 #get all recipes from vector store
 @router.get("/recipes")
-async def get_all_recipes():
+async def get_all_recipes(limit: int = 100, pagination_token: str = None):
     """
-    Get all recipes from Pinecone (limited to recent ones)
+    Get all recipes from Pinecone (paginated)
     """
     try:
-        # This is a simplified version - in production you'd want pagination
-        # For now, we'll search with a generic query to get some recipes
-        recipes = vector_store.search_similar_recipes("recipe", 100)
+        # Enumerate via Pinecone's list/fetch APIs - no embedding call or ANN
+        # query, and results are deterministic with stable pagination
+        result = await vector_store.list_recipes(limit=limit, pagination_token=pagination_token)
         return {
-            "recipes": recipes,
-            "total": len(recipes)
+            "recipes": result["recipes"],
+            "total": len(result["recipes"]),
+            "pagination_token": result["pagination_token"]
         }
     except Exception as e:
         logger.error(f"Error getting recipes: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving recipes: {str(e)}")
 
+@router.get("/image/hires")
+async def get_hires_image(prompt: str):
+    """
+    Render a high-resolution recipe image on demand.
+
+    Clients call this from the recipe detail view with the recipe's stored
+    image_prompt; list and preview paths keep the cheaper IMAGE_SIZE renders.
+    """
+    try:
+        image_url = await ai_service.ensure_hires(prompt)
+        if not image_url:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Image generation failed"
+            )
+        return {"image_url": image_url}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating high-res image: {e}")
+        raise HTTPException(status_code=500, detail="Error generating high-res image")
+
+#submit a batch recipe generation job
+@router.post("/batch")
+async def create_recipe_batch(batch_request: RecipeBatchRequest):
+    """
+    Submit a non-interactive recipe generation job via the OpenAI Batch API
+    """
+    try:
+        # Collect user profiles for all requested users
+        user_profiles = []
+        missing_users = []
+        for user_id in batch_request.user_ids:
+            user_profile = await mongodb.get_user(user_id)
+            if user_profile:
+                user_profiles.append(user_profile)
+            else:
+                missing_users.append(user_id)
+
+        if not user_profiles:
+            raise HTTPException(status_code=400, detail="No valid users found for batch generation")
+
+        batch_id = await ai_service.create_recipe_batch(user_profiles)
+
+        return {
+            "batch_id": batch_id,
+            "status": "submitted",
+            "total_users": len(user_profiles),
+            "missing_users": missing_users
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting recipe batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Error submitting recipe batch: {str(e)}")
+
+#get batch recipe generation results
+@router.get("/batch/{batch_id}")
+async def get_recipe_batch(batch_id: str):
+    """
+    Get status and results of a batch recipe generation job
+    """
+    try:
+        result = await ai_service.get_recipe_batch(batch_id)
+
+        # Persist completed recipes through the existing conversation history path (idempotent per batch)
+        if result["status"] == "completed":
+            for recipe_data in result["recipes"]:
+                conversation_id = f"batch_{batch_id}_{recipe_data.get('user_id', '')}"
+                if not await mongodb.get_conversation_by_id(conversation_id):
+                    await mongodb.store_conversation_history(recipe_data.get("user_id", ""), recipe_data, conversation_id)
+                recipe_data["conversation_id"] = conversation_id
+
+        return result
+
+    except Exception as e:
+        logger.error(f"Error retrieving recipe batch {batch_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving recipe batch: {str(e)}")
+
 #generate recipe for user
 @router.get("/{user_id}", response_model=RecipeResponse)
 async def generate_recipe(user_id: str):
     """Generate personalized recipe for user"""
     try:
         # Step 1: Retrieve user profile from MongoDB
-        user_profile = mongodb.get_user(user_id)
+        user_profile = await mongodb.get_user(user_id)
         if not user_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -68,25 +153,23 @@ async def generate_recipe(user_id: str):
                 detail="User must have at least one favorite food specified"
             )
         
-        # Search for similar recipes using the first favorite food (can be enhanced to use multiple)
-        primary_favorite = favorite_foods[0]
-        similar_recipes = vector_store.search_similar_recipes(primary_favorite, top_k=2)
-        recipe_name = similar_recipes[0].get("name", "Unknown")
+        # Search with every favorite food: one batched embedding call, parallel
+        # queries, rankings merged with RRF
+        similar_recipes = await vector_store.search_recipes_for_favorites(favorite_foods, top_k=2)
+        recipe_name = similar_recipes[0].get("name", "Unknown") if similar_recipes else "Unknown"
 
-        # Log user's favorite recipe name (first favorite food)
-        logger.info(f"User {user_id} favorite food name: {primary_favorite}")
+        logger.info("User %s favorite foods: %s", user_id, favorite_foods)
 
-        logger.info(f"Similar recipes found for user {user_id}: {recipe_name}")
+        logger.info("Similar recipes found for user %s: %s", user_id, recipe_name)
         # return
         
         # Step 3: Generate personalized recipe using OpenAI
-        recipe_data = ai_service.generate_recipe(user_profile, similar_recipes)
-        logger.info(f"Recipe data keys: {list(recipe_data.keys())}")
+        recipe_data = await ai_service.generate_recipe(user_profile, similar_recipes)
+        # keys() view instead of list(): nothing materializes unless INFO is enabled
+        logger.info("Recipe data keys: %s", recipe_data.keys())
 
         
         # Step 4: Store generated recipe in Pinecone vector database
-        import time
-        import uuid
         generated_recipe_id = f"generated_{user_id}_{int(time.time())}_{str(uuid.uuid4())[:8]}"
         
         # Prepare recipe data for vector storage - FIXED VERSION
@@ -106,22 +189,20 @@ async def generate_recipe(user_id: str):
             "user_id": recipe_data.get("user_id", user_id)  # ADDED: Include user_id
         }
         
-        # Store in vector database
-        vector_store_success = vector_store.store_recipe(generated_recipe_id, vector_recipe_data)
-        if vector_store_success:
-            logger.info(f"Stored generated recipe {generated_recipe_id} in Pinecone")
-        else:
-            logger.warning(f"Failed to store generated recipe in Pinecone")
-        
+        # Step 4: hand the Pinecone upsert to the background worker - the
+        # response never waits on the vector write (the worker logs outcomes)
+        await vector_store.enqueue_recipe(generated_recipe_id, vector_recipe_data)
+
         # Step 5: Store conversation history in MongoDB
-        conversation_id = mongodb.store_conversation_history(user_id, recipe_data)
-        logger.info(f"Stored conversation with ID: {conversation_id}")
+        conversation_id = await mongodb.store_conversation_history(user_id, recipe_data)
+        logger.info("Stored conversation with ID: %s", conversation_id)
         
         # Step 6: Add conversation_id to response
         recipe_data["conversation_id"] = conversation_id
         
-        # Step 7: Return structured response
-        return RecipeResponse(**recipe_data)
+        # Step 7: Return structured response; model_construct skips per-field
+        # re-validation since recipe_data comes from our own trusted service
+        return RecipeResponse.model_construct(**recipe_data)
         
     except HTTPException:
         raise
@@ -134,20 +215,29 @@ async def generate_recipe(user_id: str):
 
 #get conversation history for user
 @router.get("/{user_id}/history", response_model=List[ConversationHistoryResponse])
-async def get_user_conversation_history(user_id: str, limit: int = 10):
+async def get_user_conversation_history(user_id: str, request: Request, response: Response, limit: int = 10):
     """Get conversation history for a user"""
     try:
         # Verify user exists
-        user_profile = mongodb.get_user(user_id)
+        user_profile = await mongodb.get_user(user_id)
         if not user_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User with student_id {user_id} not found"
             )
-        
+
+        # History only changes when a new recipe is generated, so a cheap
+        # latest-timestamp + count ETag lets polling clients short-circuit
+        # with 304 before we fetch or serialize anything
+        stamp = await mongodb.get_conversation_history_stamp(user_id)
+        etag = hashlib.md5(f"{user_id}:{stamp['latest']}:{stamp['count']}".encode()).hexdigest()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
         # Get conversation history
-        conversations = mongodb.get_conversation_history(user_id, limit)
-        
+        conversations = await mongodb.get_conversation_history(user_id, limit)
+
+        response.headers["ETag"] = etag
         return conversations
         
     except HTTPException:
@@ -164,7 +254,7 @@ async def get_user_conversation_history(user_id: str, limit: int = 10):
 async def get_conversation_by_id(conversation_id: str):
     """Get a specific conversation by ID"""
     try:
-        conversation = mongodb.get_conversation_by_id(conversation_id)
+        conversation = await mongodb.get_conversation_by_id(conversation_id)
         
         if not conversation:
             raise HTTPException(
@@ -189,7 +279,7 @@ async def get_user_conversations_summary(user_id: str):
     """Get summary of user's conversation history"""
     try:
         # Verify user exists
-        user_profile = mongodb.get_user(user_id)
+        user_profile = await mongodb.get_user(user_id)
         if not user_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -197,7 +287,7 @@ async def get_user_conversations_summary(user_id: str):
             )
         
         # Get conversation summary
-        summary = mongodb.get_user_conversations_summary(user_id)
+        summary = await mongodb.get_user_conversations_summary(user_id)
         
         return summary
         
@@ -223,40 +313,35 @@ async def upload_pdf_recipes(file: UploadFile = File(...)):
         
         # Create temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            # Write uploaded file to temporary file
-            content = await file.read()
-            temp_file.write(content)
+            # Stream the upload in 1 MiB chunks: peak memory stays at one chunk
+            # and the event loop yields between reads instead of stalling on
+            # one large read() of the whole PDF
+            while chunk := await file.read(1 << 20):
+                temp_file.write(chunk)
             temp_file_path = temp_file.name
         
         try:
             # Process PDF and extract recipes
-            recipes = pdf_processor.process_pdf_recipes(temp_file_path)
+            recipes = await pdf_processor.process_pdf_recipes(temp_file_path)
             
             if not recipes:
                 raise HTTPException(status_code=400, detail="No recipes found in PDF")
             
-            # Upload recipes to Pinecone
-            uploaded_recipes = []
-            for i, recipe in enumerate(recipes):
-                # Generate unique ID for each recipe
-                import time
-                import uuid
-                unique_id = f"recipe_pdf_{int(time.time())}_{i}_{str(uuid.uuid4())[:8]}"
-                
-                success = vector_store.store_recipe(unique_id, recipe)
-                
-                if success:
-                    uploaded_recipes.append({
-                        "id": unique_id,
-                        "name": recipe.get("name", "Unknown"),
-                        "status": "uploaded"
-                    })
-                else:
-                    uploaded_recipes.append({
-                        "id": unique_id,
-                        "name": recipe.get("name", "Unknown"),
-                        "status": "failed"
-                    })
+            # Upload recipes to Pinecone: one batched embedding call + bulk upsert
+            unique_ids = [
+                f"recipe_pdf_{int(time.time())}_{i}_{str(uuid.uuid4())[:8]}"
+                for i in range(len(recipes))
+            ]
+            results = await vector_store.store_recipes_bulk(list(zip(unique_ids, recipes)))
+
+            uploaded_recipes = [
+                {
+                    "id": unique_id,
+                    "name": recipe.get("name", "Unknown"),
+                    "status": "uploaded" if success else "failed"
+                }
+                for unique_id, recipe, success in zip(unique_ids, recipes, results)
+            ]
             
             return {
                 "message": f"Processed {len(recipes)} recipes from PDF",
@@ -265,9 +350,9 @@ async def upload_pdf_recipes(file: UploadFile = File(...)):
             }
             
         finally:
-            # Clean up temporary file
+            # Clean up temporary file off-loop (unlink can block on network filesystems)
             if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+                await asyncio.to_thread(os.unlink, temp_file_path)
                 
     except Exception as e:
         logger.error(f"Error uploading PDF recipes: {e}")
@@ -6,6 +6,7 @@ from ..vector_store import vector_store
 from ..pdf_processor import pdf_processor
 from ..ai_service import ai_service
 from ..database import mongodb
+import asyncio
 import tempfile
 import os
 import time
@@ -20,7 +21,7 @@ async def search_recipes(query: str, top_k: int = 5):
     Search for recipes using semantic similarity
     """
     try:
-        recipes = vector_store.search_similar_recipes(query, top_k)
+        recipes = await vector_store.search_similar_recipes(query, top_k)
         return {
             "query": query,
             "results": recipes,
@@ -31,17 +32,18 @@ async def search_recipes(query: str, top_k: int = 5):
         raise HTTPException(status_code=500, detail=f"Error searching recipes: {str(e)}")
 
 @router.get("/recipes")
-async def get_all_recipes():
+async def get_all_recipes(limit: int = 20, pagination_token: str = None):
     """
-    Get all recipes from Pinecone (limited to recent ones)
+    Get all recipes from Pinecone (paginated)
     """
     try:
-        # This is a simplified version - in production you'd want pagination
-        # For now, we'll search with a generic query to get some recipes
-        recipes = vector_store.search_similar_recipes("recipe", 20)
+        # Enumerate via Pinecone's list/fetch APIs - no embedding call or ANN
+        # query, and results are deterministic with stable pagination
+        result = await vector_store.list_recipes(limit=limit, pagination_token=pagination_token)
         return {
-            "recipes": recipes,
-            "total": len(recipes)
+            "recipes": result["recipes"],
+            "total": len(result["recipes"]),
+            "pagination_token": result["pagination_token"]
         }
     except Exception as e:
         logger.error(f"Error getting recipes: {e}")
@@ -52,7 +54,7 @@ async def generate_recipe(user_id: str):
     """Generate personalized recipe for user"""
     try:
         # Step 1: Retrieve user profile from MongoDB
-        user_profile = mongodb.get_user(user_id)
+        user_profile = await mongodb.get_user(user_id)
         if not user_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -67,14 +69,15 @@ async def generate_recipe(user_id: str):
                 detail="User must have at least one favorite food specified"
             )
         
-        # Search for similar recipes using the first favorite food (can be enhanced to use multiple)
-        primary_favorite = favorite_foods[0]
-        similar_recipes = vector_store.search_similar_recipes(primary_favorite, top_k=5)
+        # Search with every favorite food: one batched embedding call, parallel
+        # queries, rankings merged with RRF
+        similar_recipes = await vector_store.search_recipes_for_favorites(favorite_foods, top_k=5)
         
         # Step 3: Generate personalized recipe using OpenAI
-        recipe_data = ai_service.generate_recipe(user_profile, similar_recipes)
-        logger.info(f"Recipe data keys: {list(recipe_data.keys())}")
-        logger.info(f"Image URL in recipe data: {recipe_data.get('image_url', 'NOT_FOUND')}")
+        recipe_data = await ai_service.generate_recipe(user_profile, similar_recipes)
+        # keys() view instead of list(): nothing materializes unless INFO is enabled
+        logger.info("Recipe data keys: %s", recipe_data.keys())
+        logger.info("Image URL in recipe data: %s", recipe_data.get('image_url', 'NOT_FOUND'))
         
         # Step 4: Store generated recipe in Pinecone vector database
         generated_recipe_id = f"generated_{user_id}_{int(time.time())}_{str(uuid.uuid4())[:8]}"
@@ -96,22 +99,20 @@ async def generate_recipe(user_id: str):
             "user_id": recipe_data.get("user_id", user_id)  # ADDED: Include user_id
         }
         
-        # Store in vector database
-        vector_store_success = vector_store.store_recipe(generated_recipe_id, vector_recipe_data)
-        if vector_store_success:
-            logger.info(f"Stored generated recipe {generated_recipe_id} in Pinecone")
-        else:
-            logger.warning(f"Failed to store generated recipe in Pinecone")
-        
+        # Step 4: hand the Pinecone upsert to the background worker - the
+        # response never waits on the vector write (the worker logs outcomes)
+        await vector_store.enqueue_recipe(generated_recipe_id, vector_recipe_data)
+
         # Step 5: Store conversation history in MongoDB
-        conversation_id = mongodb.store_conversation_history(user_id, recipe_data)
-        logger.info(f"Stored conversation with ID: {conversation_id}")
+        conversation_id = await mongodb.store_conversation_history(user_id, recipe_data)
+        logger.info("Stored conversation with ID: %s", conversation_id)
         
         # Step 6: Add conversation_id to response
         recipe_data["conversation_id"] = conversation_id
         
-        # Step 7: Return structured response
-        return RecipeResponse(**recipe_data)
+        # Step 7: Return structured response; model_construct skips per-field
+        # re-validation since recipe_data comes from our own trusted service
+        return RecipeResponse.model_construct(**recipe_data)
         
     except HTTPException:
         raise
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import Dict, Any
-from ..models import UserProfile, UserProfileResponse, UsersListResponse
+import msgspec
+from ..models import UserProfileResponse, UsersListResponse
+from ..models_fast import user_profile_decoder
 from ..database import mongodb
 import logging
 
@@ -11,23 +13,15 @@ router = APIRouter(prefix="/user", tags=["users"])
 async def get_all_users():
     """Get all user profiles"""
     try:
-        users = mongodb.get_all_users()
-        
-        # Convert to UserProfileResponse objects with migration handling
+        users = await mongodb.get_all_users()
+
+        # Legacy favorite_food fields are migrated once at startup; here we
+        # only default missing favorite_foods in-memory
         user_responses = []
         for user in users:
-            # Handle migration from favorite_food to favorite_foods
-            if 'favorite_food' in user and 'favorite_foods' not in user:
-                user['favorite_foods'] = [user['favorite_food']]
-                del user['favorite_food']
-                # Update the user in database
-                mongodb.create_or_update_user(user)
-            
-            # Ensure favorite_foods exists
-            if 'favorite_foods' not in user:
-                user['favorite_foods'] = []
-            
-            user_responses.append(UserProfileResponse(**user))
+            user.setdefault('favorite_foods', [])
+            # model_construct: data comes from our own database, skip re-validation
+            user_responses.append(UserProfileResponse.model_construct(**user))
         
         return UsersListResponse(
             users=user_responses,
@@ -45,25 +39,17 @@ async def get_all_users():
 async def get_user(user_id: str):
     """Get user profile by student_id"""
     try:
-        user = mongodb.get_user(user_id)
+        user = await mongodb.get_user(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User with student_id {user_id} not found"
             )
         
-        # Handle migration from favorite_food to favorite_foods
-        if 'favorite_food' in user and 'favorite_foods' not in user:
-            user['favorite_foods'] = [user['favorite_food']]
-            del user['favorite_food']
-            # Update the user in database
-            mongodb.create_or_update_user(user)
-        
-        # Ensure favorite_foods exists
-        if 'favorite_foods' not in user:
-            user['favorite_foods'] = []
-        
-        return UserProfileResponse(**user)
+        # Ensure favorite_foods exists (legacy fields migrated at startup)
+        user.setdefault('favorite_foods', [])
+
+        return UserProfileResponse.model_construct(**user)
         
     except HTTPException:
         raise
@@ -75,45 +61,30 @@ async def get_user(user_id: str):
         )
 
 @router.post("/", response_model=UserProfileResponse)
-async def create_or_update_user(user: UserProfile):
+async def create_or_update_user(request: Request):
     """Create or update user profile"""
     try:
-        # Convert Pydantic model to dict
-        user_data = user.dict()
-        
-        # Handle migration from favorite_food to favorite_foods if needed
-        if 'favorite_food' in user_data and 'favorite_foods' not in user_data:
-            user_data['favorite_foods'] = [user_data['favorite_food']]
-            del user_data['favorite_food']
-        
-        # Create or update user in MongoDB
-        success = mongodb.create_or_update_user(user_data)
-        
-        if not success:
+        # Decode the body straight from bytes with msgspec - no per-field
+        # validator dispatch (the UserProfile model in app/models.py stays
+        # as the documented schema)
+        try:
+            profile = user_profile_decoder.decode(await request.body())
+        except msgspec.DecodeError as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create/update user profile"
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
             )
-        
-        # Retrieve the updated user data
-        updated_user = mongodb.get_user(user.student_id)
+        user_data = msgspec.to_builtins(profile)
+
+        # One atomic round trip: write, migrate legacy fields, read back
+        updated_user = await mongodb.upsert_user_atomic(user_data)
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to retrieve updated user profile"
+                detail="Failed to create/update user profile"
             )
-        
-        # Handle migration for retrieved user data
-        if 'favorite_food' in updated_user and 'favorite_foods' not in updated_user:
-            updated_user['favorite_foods'] = [updated_user['favorite_food']]
-            del updated_user['favorite_food']
-            mongodb.create_or_update_user(updated_user)
-        
-        # Ensure favorite_foods exists
-        if 'favorite_foods' not in updated_user:
-            updated_user['favorite_foods'] = []
-        
-        return UserProfileResponse(**updated_user)
+
+        return UserProfileResponse.model_construct(**updated_user)
         
     except HTTPException:
         raise
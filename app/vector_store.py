@@ -1,18 +1,105 @@
-from pinecone import Pinecone
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
-import json
+from pinecone.grpc import PineconeGRPC
+from cachetools import TTLCache
+from dataclasses import dataclass
+from typing import List, Dict, Any, ClassVar, Optional
+import asyncio
+import hashlib
 import logging
+import os
+import sqlite3
+import numpy as np
+import orjson
 from .config import settings
+from .openai_client import client as shared_openai_client
+
+# Optional local ANN mirror: when faiss is installed, reads are served from
+# an in-process HNSW index instead of a Pinecone round trip
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True, frozen=True)
+class VectorRecipe:
+    """Flattened recipe fields for embedding-text assembly.
+
+    The joins happen once at construction and the text comes from a
+    precompiled template - no intermediate dict per call on the store path.
+    """
+    name: str
+    ingredients: str
+    instructions: str
+
+    TEMPLATE: ClassVar[str] = "{name} {ingredients} {instructions}"
+
+    @classmethod
+    def from_dict(cls, recipe_data: Dict[str, Any]) -> "VectorRecipe":
+        return cls(
+            name=recipe_data.get("name", ""),
+            ingredients=" ".join(recipe_data.get("ingredients", [])),
+            instructions=" ".join(recipe_data.get("instructions", []))
+        )
+
+    def to_embedding_text(self) -> str:
+        return self.TEMPLATE.format(
+            name=self.name, ingredients=self.ingredients, instructions=self.instructions
+        )
+
 class VectorStore:
     def __init__(self):
         self.pc = None
         self.index = None
         self.openai_client = None
+        # LRU+TTL cache for query embeddings: repeat queries (e.g. the same
+        # favorite food across users) skip the OpenAI round trip entirely
+        self._embedding_cache = TTLCache(
+            maxsize=settings.EMBEDDING_CACHE_SIZE,
+            ttl=settings.EMBEDDING_CACHE_TTL
+        )
+        self._embedding_cache_lock = asyncio.Lock()
+        # Background upsert queue: routes enqueue and return immediately,
+        # the worker task drains writes off the request path
+        self._upsert_queue: Optional[asyncio.Queue] = None
+        self._upsert_task: Optional[asyncio.Task] = None
+        # Local FAISS HNSW mirror of the Pinecone index (hot reads stay
+        # in-process); row i of the index pairs with _local_ids[i],
+        # _local_metadata[i] and _local_matrix[i]. The normalized matrix is
+        # kept so the HNSW graph can be rebuilt after updates and deletes.
+        self.local_index = None
+        self._local_ids: List[str] = []
+        self._local_metadata: List[Dict[str, Any]] = []
+        self._local_matrix: Optional[np.ndarray] = None
+        self._local_positions: Dict[str, int] = {}
+        # Durable content-hash cache for recipe embeddings: re-storing an
+        # unchanged recipe (restarts, debug runs) skips the paid API call
+        self._embedding_db = self._open_embedding_db()
         self.connect()
+        self._init_local_index()
+
+    @staticmethod
+    def _open_embedding_db() -> sqlite3.Connection:
+        """Open the embedding cache database, creating the table if needed"""
+        db = sqlite3.connect(settings.EMBEDDING_DB_PATH, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache (hash TEXT PRIMARY KEY, vector BLOB)"
+        )
+        return db
+
+    def reset_after_fork(self):
+        """Rebuild per-process resources that must not be shared across fork.
+
+        sqlite3 connections are documented as unsafe to use across fork, and
+        the FAISS mirror should be reloaded per worker rather than inherited
+        mid-mutation from the preloading master.
+        """
+        try:
+            self._embedding_db.close()
+        except Exception:
+            pass
+        self._embedding_db = self._open_embedding_db()
+        self._init_local_index()
     
     def connect(self):
         """Initialize Pinecone and OpenAI clients"""
@@ -21,27 +108,32 @@ class VectorStore:
             if not settings.PINECONE_API_KEY:
                 raise ValueError("PINECONE_API_KEY not configured")
             
-            self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+            # gRPC transport: noticeably faster than REST for bulk upserts and
+            # supports async_req futures for pipelining requests
+            self.pc = PineconeGRPC(api_key=settings.PINECONE_API_KEY)
             
-            # Get or create index
-            try:
-                self.index = self.pc.Index(settings.PINECONE_INDEX_NAME)
-                logger.info(f"Connected to existing Pinecone index: {settings.PINECONE_INDEX_NAME}")
-            except Exception:
-                # Index doesn't exist, create it
+            # Get or create index: one cheap metadata listing instead of
+            # probing with exception-as-control-flow and constructing the
+            # Index handle twice
+            index_name = settings.PINECONE_INDEX_NAME
+            existing_indexes = {index.name for index in self.pc.list_indexes()}
+            if index_name not in existing_indexes:
                 self.pc.create_index(
-                    name=settings.PINECONE_INDEX_NAME,
-                    dimension=1536,  # OpenAI embedding dimension
+                    name=index_name,
+                    dimension=settings.EMBEDDING_DIM,
                     metric="cosine"
                 )
-                logger.info(f"Created Pinecone index: {settings.PINECONE_INDEX_NAME}")
-                self.index = self.pc.Index(settings.PINECONE_INDEX_NAME)
+                logger.info(f"Created Pinecone index: {index_name}")
+
+            self.index = self.pc.Index(index_name)
+            logger.info(f"Connected to Pinecone index: {index_name}")
             
-            # Initialize OpenAI client
+            # Async OpenAI client (shared pool): embedding calls are awaited so
+            # they don't block the event loop while FastAPI serves other requests
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY not configured")
-            
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+            self.openai_client = shared_openai_client
             
             logger.info("Successfully connected to Pinecone and OpenAI")
             
@@ -49,56 +141,313 @@ class VectorStore:
             logger.error(f"Error initializing vector store: {e}")
             raise
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI"""
+    def _init_local_index(self):
+        """Build the local HNSW mirror, reloading persisted state when present.
+
+        Vectors are L2-normalized and searched with inner product, so local
+        scores match Pinecone's cosine scores. No-op when faiss isn't installed.
+        """
+        if faiss is None:
+            return
+        try:
+            index_path = settings.FAISS_INDEX_PATH
+            sidecar_path = f"{index_path}.meta.json"
+            matrix_path = f"{index_path}.vectors.npy"
+            self._local_ids = []
+            self._local_metadata = []
+            self._local_matrix = None
+            self._local_positions = {}
+            if os.path.exists(index_path) and os.path.exists(sidecar_path) and os.path.exists(matrix_path):
+                self.local_index = faiss.read_index(index_path)
+                with open(sidecar_path, "rb") as f:
+                    sidecar = orjson.loads(f.read())
+                self._local_ids = sidecar["ids"]
+                self._local_metadata = sidecar["metadata"]
+                self._local_matrix = np.load(matrix_path)
+                self._local_positions = {recipe_id: i for i, recipe_id in enumerate(self._local_ids)}
+                logger.info("Loaded local FAISS index with %d vectors", self.local_index.ntotal)
+            else:
+                self.local_index = faiss.IndexHNSWFlat(settings.EMBEDDING_DIM, 32, faiss.METRIC_INNER_PRODUCT)
+                logger.info("Initialized empty local FAISS index")
+        except Exception as e:
+            logger.error(f"Error initializing local FAISS index: {e}")
+            self.local_index = None
+
+    def _rebuild_local_index(self):
+        """Rebuild the HNSW graph from the stored rows (HNSW has no in-place update/remove)"""
+        self.local_index = faiss.IndexHNSWFlat(settings.EMBEDDING_DIM, 32, faiss.METRIC_INNER_PRODUCT)
+        if self._local_matrix is not None and len(self._local_matrix):
+            self.local_index.add(self._local_matrix)
+
+    def _local_add(self, recipe_id: str, embedding: List[float], metadata: Dict[str, Any]):
+        """Mirror an upserted vector into the local index (best-effort)"""
+        if self.local_index is None:
+            return
+        try:
+            vector = np.asarray([embedding], dtype=np.float32)
+            faiss.normalize_L2(vector)
+            position = self._local_positions.get(recipe_id)
+            if position is not None:
+                # Re-upsert of a known ID: refresh the stored row and rebuild
+                self._local_matrix[position] = vector[0]
+                self._local_metadata[position] = metadata
+                self._rebuild_local_index()
+            else:
+                self._local_matrix = vector if self._local_matrix is None else np.vstack([self._local_matrix, vector])
+                self.local_index.add(vector)
+                self._local_positions[recipe_id] = len(self._local_ids)
+                self._local_ids.append(recipe_id)
+                self._local_metadata.append(metadata)
+        except Exception as e:
+            logger.error(f"Error mirroring recipe {recipe_id} into local index: {e}")
+
+    def _local_remove_by_name(self, name_lc: str):
+        """Drop mirrored rows whose name matches, keeping the mirror consistent with Pinecone"""
+        if self.local_index is None or not self._local_ids:
+            return
+        try:
+            keep = [i for i, metadata in enumerate(self._local_metadata) if metadata.get("name_lc") != name_lc]
+            if len(keep) == len(self._local_ids):
+                return
+            self._local_matrix = self._local_matrix[keep] if keep else None
+            self._local_ids = [self._local_ids[i] for i in keep]
+            self._local_metadata = [self._local_metadata[i] for i in keep]
+            self._local_positions = {recipe_id: i for i, recipe_id in enumerate(self._local_ids)}
+            self._rebuild_local_index()
+        except Exception as e:
+            logger.error(f"Error removing recipes named {name_lc} from local index: {e}")
+
+    def save_local_index(self):
+        """Persist the local index, its row matrix and the id/metadata sidecar (app shutdown)"""
+        if self.local_index is None or self.local_index.ntotal == 0:
+            return
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text
+            index_path = settings.FAISS_INDEX_PATH
+            faiss.write_index(self.local_index, index_path)
+            np.save(f"{index_path}.vectors.npy", self._local_matrix)
+            with open(f"{index_path}.meta.json", "wb") as f:
+                f.write(orjson.dumps({"ids": self._local_ids, "metadata": self._local_metadata}, default=str))
+            logger.info("Persisted local FAISS index (%d vectors)", self.local_index.ntotal)
+        except Exception as e:
+            logger.error(f"Error persisting local FAISS index: {e}")
+
+    @staticmethod
+    def _recipe_text(recipe_data: Dict[str, Any]) -> str:
+        """Build the embedding text for a recipe from its name, ingredients and instructions"""
+        return VectorRecipe.from_dict(recipe_data).to_embedding_text()
+
+    @classmethod
+    def _recipe_hash(cls, recipe_data: Dict[str, Any]) -> str:
+        """Content hash over the embedding input text.
+
+        Only name, ingredients and instructions feed the vector; hashing the
+        full dict would fold in per-request fields like generated_at and
+        conversation_id and the cache would never hit across generations.
+        """
+        return hashlib.sha256(cls._recipe_text(recipe_data).encode()).hexdigest()
+
+    def _cached_recipe_embedding(self, content_hash: str) -> Optional[List[float]]:
+        """Look up a previously computed embedding for this recipe content"""
+        row = self._embedding_db.execute(
+            "SELECT vector FROM embedding_cache WHERE hash = ?", (content_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _store_recipe_embedding(self, content_hash: str, embedding: List[float]):
+        """Persist a computed embedding under its content hash"""
+        # The with-block wraps the insert in a transaction, which SQLite
+        # needs for its single-writer guarantee
+        with self._embedding_db:
+            self._embedding_db.execute(
+                "INSERT OR IGNORE INTO embedding_cache (hash, vector) VALUES (?, ?)",
+                (content_hash, np.asarray(embedding, dtype=np.float32).tobytes())
+            )
+
+    async def _recipe_embedding(self, recipe_data: Dict[str, Any]) -> List[float]:
+        """Embedding for a recipe, served from the content-hash cache when unchanged"""
+        content_hash = self._recipe_hash(recipe_data)
+        cached = self._cached_recipe_embedding(content_hash)
+        if cached is not None:
+            return cached
+        embedding = await self.get_embedding(self._recipe_text(recipe_data))
+        self._store_recipe_embedding(content_hash, embedding)
+        return embedding
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Generate embedding for text using OpenAI, with an in-process cache"""
+        try:
+            key = text.strip().lower()
+            async with self._embedding_cache_lock:
+                cached = self._embedding_cache.get(key)
+            if cached is not None:
+                return cached
+
+            response = await self.openai_client.embeddings.create(
+                model=settings.EMBEDDING_MODEL,
+                input=text,
+                dimensions=settings.EMBEDDING_DIM
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+
+            async with self._embedding_cache_lock:
+                self._embedding_cache[key] = embedding
+            return embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
-    def store_recipe(self, recipe_id: str, recipe_data: Dict[str, Any]) -> bool:
+    async def store_recipe(self, recipe_id: str, recipe_data: Dict[str, Any]) -> bool:
         """Store recipe in Pinecone with embeddings"""
         try:
-            # Create text representation of recipe
-            recipe_text = f"{recipe_data.get('name', '')} {recipe_data.get('ingredients', [])} {recipe_data.get('instructions', [])}"
-            
-            # Generate embedding
-            embedding = self.get_embedding(recipe_text)
-            
-            # Generate unique ID to avoid conflicts
-            import time
-            import uuid
-            unique_id = f"{recipe_id}_{int(time.time())}_{str(uuid.uuid4())[:8]}"
-            
-            # Store in Pinecone using new API
-            self.index.upsert(
+            # Generate embedding (content-hash cache: unchanged recipes reuse
+            # their stored vector instead of paying for a new API call)
+            embedding = await self._recipe_embedding(recipe_data)
+
+            # Store in Pinecone under the caller's ID - routes already generate
+            # unique IDs, so the old time/uuid suffixing only bloated them
+            # (name_lc enables case-insensitive metadata-filter deletes)
+            # async_req returns a gRPC future; awaiting it off-loop keeps the
+            # event loop free for the duration of the round trip (the chunk2-5
+            # background worker runs on the request loop)
+            metadata = {**recipe_data, "name_lc": recipe_data.get("name", "").lower()}
+            async_result = self.index.upsert(
                 vectors=[{
-                    "id": unique_id,
+                    "id": recipe_id,
                     "values": embedding,
-                    "metadata": recipe_data
-                }]
+                    "metadata": metadata
+                }],
+                async_req=True
             )
-            
-            logger.info(f"Stored recipe {unique_id} in Pinecone")
+            await asyncio.to_thread(async_result.result)
+            self._local_add(recipe_id, embedding, metadata)
+
+            logger.info("Stored recipe %s in Pinecone", recipe_id)
             return True
             
         except Exception as e:
             logger.error(f"Error storing recipe {recipe_id}: {e}")
             return False
     
-    def search_similar_recipes(self, query: str, top_k: int = 2) -> List[Dict[str, Any]]:
+    def start_upsert_worker(self):
+        """Create the upsert queue and spawn the background worker (app startup)"""
+        self._upsert_queue = asyncio.Queue()
+        self._upsert_task = asyncio.create_task(self._upsert_worker())
+        logger.info("Vector store upsert worker started")
+
+    async def enqueue_recipe(self, recipe_id: str, recipe_data: Dict[str, Any]):
+        """Queue a recipe for background upsert; returns in microseconds.
+
+        Falls back to a blocking store when the worker isn't running (e.g.
+        scripts that never went through app startup).
+        """
+        if self._upsert_queue is None:
+            await self.store_recipe(recipe_id, recipe_data)
+            return
+        await self._upsert_queue.put((recipe_id, recipe_data))
+
+    async def _upsert_worker(self):
+        """Drain queued recipes into Pinecone, one at a time, off the request path"""
+        while True:
+            recipe_id, recipe_data = await self._upsert_queue.get()
+            try:
+                await self.store_recipe(recipe_id, recipe_data)
+            except Exception as e:
+                logger.error(f"Error in background upsert for {recipe_id}: {e}")
+            finally:
+                self._upsert_queue.task_done()
+
+    async def drain_upserts(self):
+        """Flush pending upserts and stop the worker (app shutdown)"""
+        if self._upsert_queue is not None:
+            await self._upsert_queue.join()
+        if self._upsert_task is not None:
+            self._upsert_task.cancel()
+            self._upsert_task = None
+        logger.info("Vector store upsert queue drained")
+
+    async def store_recipes_bulk(self, items: List[tuple]) -> List[bool]:
+        """Store many recipes at once: one batched embedding call, chunked upserts.
+
+        items is a list of (recipe_id, recipe_data) pairs. Batching turns N
+        embedding round trips into one (OpenAI accepts up to 2048 inputs per
+        request) and N single-vector upserts into a few bulk ones.
+        """
+        if not items:
+            return []
+        try:
+            # Serve unchanged recipes from the content-hash cache and batch
+            # one embedding call for the rest
+            hashes = [self._recipe_hash(data) for _, data in items]
+            embeddings: List[Optional[List[float]]] = [
+                self._cached_recipe_embedding(content_hash) for content_hash in hashes
+            ]
+            misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if misses:
+                response = await self.openai_client.embeddings.create(
+                    model=settings.EMBEDDING_MODEL,
+                    input=[self._recipe_text(items[i][1]) for i in misses],
+                    dimensions=settings.EMBEDDING_DIM
+                )
+                for position, i in enumerate(misses):
+                    embeddings[i] = response.data[position].embedding
+                    self._store_recipe_embedding(hashes[i], embeddings[i])
+
+            vectors = [
+                {
+                    "id": recipe_id,
+                    "values": embeddings[i],
+                    "metadata": {**data, "name_lc": data.get("name", "").lower()}
+                }
+                for i, (recipe_id, data) in enumerate(items)
+            ]
+
+            # Chunk upserts to stay under Pinecone's request payload limit and
+            # pipeline the chunks over the gRPC connection instead of
+            # serializing them
+            async_results = [
+                self.index.upsert(vectors=vectors[start:start + 100], async_req=True)
+                for start in range(0, len(vectors), 100)
+            ]
+            await asyncio.gather(*[asyncio.to_thread(r.result) for r in async_results])
+
+            for vector in vectors:
+                self._local_add(vector["id"], vector["values"], vector["metadata"])
+
+            logger.info("Stored %d recipes in Pinecone via bulk upsert", len(vectors))
+            return [True] * len(items)
+
+        except Exception as e:
+            logger.error(f"Error bulk-storing {len(items)} recipes: {e}")
+            return [False] * len(items)
+
+    async def search_similar_recipes(self, query: str, top_k: int = 2) -> List[Dict[str, Any]]:
         """Search for similar recipes using semantic similarity"""
         try:
             # Generate embedding for query
-            query_embedding = self.get_embedding(query)
-            
-            # Search in Pinecone using new API
-            results = self.index.query(
+            query_embedding = await self.get_embedding(query)
+
+            # Serve from the local HNSW mirror when it has enough vectors:
+            # in-process SIMD search instead of a network round trip
+            if self.local_index is not None and self.local_index.ntotal >= top_k:
+                query_vector = np.asarray([query_embedding], dtype=np.float32)
+                faiss.normalize_L2(query_vector)
+                scores, indexes = self.local_index.search(query_vector, top_k)
+                return [
+                    {
+                        "id": self._local_ids[i],
+                        "score": float(score),
+                        "name": self._local_metadata[i].get('name', 'Unknown'),
+                        "metadata": self._local_metadata[i]
+                    }
+                    for score, i in zip(scores[0], indexes[0]) if i >= 0
+                ]
+
+            # Search in Pinecone using new API (off-loop: the gRPC query call
+            # is sync, same offload as the batch and listing paths)
+            results = await asyncio.to_thread(
+                self.index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 include_metadata=True
@@ -121,42 +470,142 @@ class VectorStore:
             logger.error(f"Error searching recipes: {e}")
             return []
     
-    def delete_recipes_by_name(self, recipe_name: str) -> int:
-        """Delete all recipes with the specified name from Pinecone"""
+    async def search_similar_recipes_batch(self, queries: List[str], top_k: int = 2) -> List[List[Dict[str, Any]]]:
+        """Run many searches at once: one batched embedding call, concurrent queries.
+
+        Amortizes the OpenAI round trip and per-request overhead across the
+        whole batch; returns one result list per query, in order.
+        """
         try:
-            # First, we need to find all recipes with this name
-            # Since Pinecone doesn't support direct metadata filtering in queries,
-            # we'll use a semantic search with the recipe name to find matches
-            query_embedding = self.get_embedding(recipe_name)
-            
-            # Search for recipes with a high top_k to get more results
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=100,  # High number to get all potential matches
-                include_metadata=True
+            if not queries:
+                return []
+
+            response = await self.openai_client.embeddings.create(
+                model=settings.EMBEDDING_MODEL,
+                input=queries,
+                dimensions=settings.EMBEDDING_DIM
             )
-            
-            # Filter results to find exact name matches
-            recipes_to_delete = []
-            for match in results.matches:
-                if match.metadata.get('name', '').lower() == recipe_name.lower():
-                    recipes_to_delete.append(match.id)
-            
-            if not recipes_to_delete:
-                logger.info(f"No recipes found with name: {recipe_name}")
-                return 0
-            
-            # Delete the recipes from Pinecone
-            self.index.delete(ids=recipes_to_delete)
-            
-            logger.info(f"Deleted {len(recipes_to_delete)} recipes with name: {recipe_name}")
-            return len(recipes_to_delete)
-            
+            embeddings = [item.embedding for item in response.data]
+
+            results = await asyncio.gather(*[
+                asyncio.to_thread(self.index.query, vector=embedding, top_k=top_k, include_metadata=True)
+                for embedding in embeddings
+            ])
+
+            return [
+                [
+                    {
+                        "id": match.id,
+                        "score": match.score,
+                        "name": match.metadata.get('name', 'Unknown'),
+                        "metadata": match.metadata
+                    }
+                    for match in result.matches
+                ]
+                for result in results
+            ]
+
+        except Exception as e:
+            logger.error(f"Error batch-searching recipes: {e}")
+            return [[] for _ in queries]
+
+    async def search_recipes_for_favorites(self, favorite_foods: List[str], top_k: int = 2) -> List[Dict[str, Any]]:
+        """Search with every favorite food and merge the rankings.
+
+        All favorites are embedded in one batched call, the ANN queries run
+        concurrently, and the per-favorite rankings are fused with Reciprocal
+        Rank Fusion so recipes matching several favorites rise to the top.
+        """
+        try:
+            if not favorite_foods:
+                return []
+            if len(favorite_foods) == 1:
+                return await self.search_similar_recipes(favorite_foods[0], top_k)
+
+            response = await self.openai_client.embeddings.create(
+                model=settings.EMBEDDING_MODEL,
+                input=favorite_foods,
+                dimensions=settings.EMBEDDING_DIM
+            )
+            embeddings = [item.embedding for item in response.data]
+
+            # One query per favorite, fired concurrently (the gRPC query call is sync)
+            results = await asyncio.gather(*[
+                asyncio.to_thread(self.index.query, vector=embedding, top_k=top_k, include_metadata=True)
+                for embedding in embeddings
+            ])
+
+            # Reciprocal Rank Fusion: score[id] += 1 / (rank + 60)
+            fused_scores: Dict[str, float] = {}
+            matches_by_id: Dict[str, Any] = {}
+            for result in results:
+                for rank, match in enumerate(result.matches):
+                    fused_scores[match.id] = fused_scores.get(match.id, 0.0) + 1.0 / (rank + 60)
+                    matches_by_id.setdefault(match.id, match)
+
+            ranked = sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [
+                {
+                    "id": match_id,
+                    "score": score,
+                    "name": matches_by_id[match_id].metadata.get('name', 'Unknown'),
+                    "metadata": matches_by_id[match_id].metadata
+                }
+                for match_id, score in ranked
+            ]
+
+        except Exception as e:
+            logger.error(f"Error searching recipes for favorites: {e}")
+            return []
+
+    async def list_recipes(self, limit: int = 100, pagination_token: Optional[str] = None) -> Dict[str, Any]:
+        """List stored recipes via Pinecone pagination instead of an ANN query.
+
+        Skips the embedding call entirely and returns deterministic results
+        with a pagination token for the next page. The sync Pinecone calls
+        run in threads so the event loop keeps serving other requests.
+        """
+        try:
+            listing = await asyncio.to_thread(
+                self.index.list_paginated, limit=limit, pagination_token=pagination_token
+            )
+            ids = [vector.id for vector in (listing.vectors or [])]
+
+            recipes = []
+            if ids:
+                fetched = await asyncio.to_thread(self.index.fetch, ids=ids)
+                recipes = [
+                    {"id": vector_id, "metadata": vector.metadata}
+                    for vector_id, vector in fetched.vectors.items()
+                ]
+
+            next_token = listing.pagination.next if listing.pagination else None
+            return {"recipes": recipes, "pagination_token": next_token}
+
+        except Exception as e:
+            logger.error(f"Error listing recipes: {e}")
+            return {"recipes": [], "pagination_token": None}
+
+    def delete_recipes_by_name(self, recipe_name: str) -> bool:
+        """Delete all recipes with the specified name from Pinecone"""
+        try:
+            # Metadata-filter delete: complete (no top-100 ANN cutoff) and
+            # needs no embedding call; matches the name_lc field stored at
+            # insert time so lookups are case-insensitive
+            self.index.delete(filter={"name_lc": recipe_name.lower()})
+
+            # Keep the local mirror in sync so deleted recipes stop being
+            # served (and persisted) from in-process reads
+            self._local_remove_by_name(recipe_name.lower())
+
+            logger.info("Deleted recipes with name: %s", recipe_name)
+            return True
+
         except Exception as e:
             logger.error(f"Error deleting recipes with name {recipe_name}: {e}")
-            return 0
+            return False
     
-    def initialize_sample_data(self):
+    async def initialize_sample_data(self):
         """Initialize Pinecone with sample recipe data"""
         sample_recipes = [
             {
@@ -188,9 +637,10 @@ class VectorStore:
             }
         ]
         
-        for recipe in sample_recipes:
-            self.store_recipe(recipe["id"], recipe)
-        
+        # One batched embedding call plus pipelined upserts instead of a
+        # serial round trip per recipe
+        await self.store_recipes_bulk([(recipe["id"], recipe) for recipe in sample_recipes])
+
         logger.info("Initialized Pinecone with sample recipe data")
 
 # Create global vector store instance
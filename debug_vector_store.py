@@ -9,17 +9,20 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.vector_store import vector_store
 from app.ai_service import ai_service
+import asyncio
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging: INFO by default - DEBUG pulls in full OpenAI/httpx
+# request traces that dwarf the actual workload
+logging.basicConfig(level=logging.INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("openai").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
-def test_vector_store():
+async def test_vector_store():
     """Test vector store functionality"""
     try:
         # Test 1: Store a simple recipe
-        print("=== Test 1: Store simple recipe ===")
         test_recipe = {
             "name": "Test Recipe",
             "ingredients": ["test ingredient"],
@@ -29,11 +32,7 @@ def test_vector_store():
             "cooking_time": "10 minutes"
         }
         
-        success = vector_store.store_recipe("test_recipe_1", test_recipe)
-        print(f"Store success: {success}")
-        
         # Test 2: Store a recipe with problematic data (like the current issue)
-        print("\n=== Test 2: Store recipe with problematic data ===")
         problematic_recipe = {
             "name": "Problematic Recipe",
             "ingredients": ["ingredient1", "ingredient2"],
@@ -43,16 +42,25 @@ def test_vector_store():
             "cooking_time": "30 minutes",
             "generated_at": "2025-08-03T16:52:33.265345"  # This is a string
         }
-        
-        success = vector_store.store_recipe("test_recipe_2", problematic_recipe)
-        print(f"Store success: {success}")
-        
-        # Test 3: Search for recipes
+
+        # The two stores are independent network round trips: gather them so
+        # the wall time is the max of the two rather than the sum
+        print("=== Tests 1+2: Store simple and problematic recipes concurrently ===")
+        results = await asyncio.gather(
+            vector_store.store_recipe("test_recipe_1", test_recipe),
+            vector_store.store_recipe("test_recipe_2", problematic_recipe)
+        )
+        for recipe_id, success in zip(["test_recipe_1", "test_recipe_2"], results):
+            print(f"Store success for {recipe_id}: {success}")
+
+        # Test 3: Search for recipes (batched: one embedding call for all queries)
         print("\n=== Test 3: Search for recipes ===")
-        results = vector_store.search_similar_recipes("test", 5)
-        print(f"Found {len(results)} recipes")
-        for result in results:
-            print(f"  - {result['metadata'].get('name', 'Unknown')} (score: {result['score']:.3f})")
+        queries = ["test", "problematic"]
+        batch_results = await vector_store.search_similar_recipes_batch(queries, 5)
+        for query, results in zip(queries, batch_results):
+            print(f"Found {len(results)} recipes for '{query}'")
+            for result in results:
+                print(f"  - {result['metadata'].get('name', 'Unknown')} (score: {result['score']:.3f})")
             
     except Exception as e:
         print(f"Error in test: {e}")
@@ -60,4 +68,4 @@ def test_vector_store():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    test_vector_store() 
\ No newline at end of file
+    asyncio.run(test_vector_store())
\ No newline at end of file
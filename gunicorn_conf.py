@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for production deployments.
+
+Run with: gunicorn -c gunicorn_conf.py main:app
+"""
+
+import os
+
+from app.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+
+# Process-level concurrency scales throughput across cores; the async
+# changes inside each worker handle the I/O-bound concurrency
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() * 2) + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers fork with modules (and the
+# Pinecone index handle) already loaded
+preload_app = True
+
+def post_fork(server, worker):
+    """Reinitialize per-process state after fork.
+
+    HTTP/gRPC connection pools opened in the master don't survive fork;
+    each worker rebuilds its Pinecone connection here. The SQLite
+    embedding cache and the FAISS mirror are also reopened per worker -
+    sqlite3 connections are unsafe across fork. MongoDB and the shared
+    OpenAI client connect lazily in the app startup hook, which runs per
+    worker.
+    """
+    from app.vector_store import vector_store
+    vector_store.connect()
+    vector_store.reset_after_fork()
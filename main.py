@@ -1,7 +1,10 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
 import uvicorn
 import logging
+import os
 from app.config import settings
 from app.routes import users, recipes
 from app.vector_store import vector_store
@@ -13,13 +16,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown lifecycle (replaces the deprecated on_event hooks)"""
+    try:
+        # Establish the async MongoDB connection (runs the one-time migration)
+        from app.database import mongodb
+        await mongodb.connect()
+
+        # Background Pinecone upsert worker: routes enqueue, worker drains
+        vector_store.start_upsert_worker()
+
+        # Warm the shared embedding client: performs the TLS handshake and
+        # opens the pooled connection so the first real request doesn't pay it
+        try:
+            await vector_store.get_embedding("warmup")
+        except Exception as e:
+            logger.warning(f"Embedding warm-up failed: {e}")
+
+        # Semantic response cache (module-level singleton shared by the AI service)
+        from app.response_cache import response_cache
+        logger.info(
+            f"Semantic cache ready (threshold={response_cache.threshold}, "
+            f"ttl={response_cache.ttl_seconds}s, capacity={response_cache.max_entries})"
+        )
+
+        # Expose the shared service singletons on app.state so handlers and
+        # middleware can reach them without module imports
+        app.state.mongodb = mongodb
+        app.state.vector_store = vector_store
+        app.state.response_cache = response_cache
+
+        # Initialize sample data in Pinecone - COMMENTED OUT to prevent running every time
+        # await vector_store.initialize_sample_data()
+        logger.info("Application startup completed successfully")
+    except Exception as e:
+        logger.error(f"Error during startup: {e}")
+        raise
+
+    yield
+
+    try:
+        # Flush queued vector writes before tearing down clients, then
+        # persist the local FAISS mirror so reads warm up on next boot
+        await vector_store.drain_upserts()
+        vector_store.save_local_index()
+
+        # Close the shared OpenAI HTTP connection pool
+        from app import openai_client
+        await openai_client.close()
+
+        # Tear down the PDF extraction process pool
+        from app.pdf_processor import shutdown_pdf_executor
+        shutdown_pdf_executor()
+
+        # Close MongoDB connection
+        from app.database import mongodb
+        await mongodb.close()
+        logger.info("Application shutdown completed")
+    except Exception as e:
+        logger.error(f"Error during shutdown: {e}")
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="AI-powered recipe recommendation MVP API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -56,33 +122,25 @@ async def health_check():
         }
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    try:
-        # Initialize sample data in Pinecone - COMMENTED OUT to prevent running every time
-        # vector_store.initialize_sample_data()
-        logger.info("Application startup completed successfully")
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
-        raise
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    try:
-        # Close MongoDB connection
-        from app.database import mongodb
-        mongodb.close()
-        logger.info("Application shutdown completed")
-    except Exception as e:
-        logger.error(f"Error during shutdown: {e}")
-
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info"
-    ) 
\ No newline at end of file
+    if settings.DEBUG:
+        # Development: single worker with auto-reload
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        # Production: one worker per core on uvloop/httptools; the lifespan
+        # builds connection pools per process, so each worker gets its own
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count())),
+            loop="uvloop",
+            http="httptools",
+            log_level="info"
+        )